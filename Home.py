@@ -1,8 +1,9 @@
 import streamlit as st
-from PIL import Image
 from st_pages import Page, Section, show_pages, add_page_title
 from st_pages import show_pages_from_config
 
+from utils import rendering
+
 
 st.set_page_config(
     page_title='Home',
@@ -10,7 +11,7 @@ st.set_page_config(
 )
 
 #image_path = 'pngwing.com.png'
-image = Image.open( 'pngwing.com.png' )
+image = rendering.logo()
 st.sidebar.image( image, width=230 )
 
 st.sidebar.markdown( '# La Place Company' )
@@ -0,0 +1,60 @@
+# Libraries
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_raw
+from utils.cleaning import clean_code
+from utils.cube import build_cube
+from utils.incremental import concat_clean, merge_cube
+from utils.streaming import build_aggregates, merge_aggregates
+
+# Tamanhos padrão do histórico e linhas de cada lote incorporado
+SIZES = [100_000, 1_000_000]
+BATCH_ROWS = 1_000
+
+# Execuções cronometradas por etapa (vale a menor)
+REPEATS = 3
+
+
+def _seconds( func, *args ):
+    """ Menor tempo (s) entre REPEATS execuções """
+    tempos = []
+    for _ in range( REPEATS ):
+        inicio = time.perf_counter()
+        func( *args )
+        tempos.append( time.perf_counter() - inicio )
+
+    return min( tempos )
+
+
+def run( n_linhas, batch_rows=BATCH_ROWS ):
+    """ Esta função tem a responsabilidade de medir o custo de incorporar um lote por tamanho do histórico
+        Tipos de ações:
+        1. Limpar um histórico de n_linhas e um lote de batch_rows linhas sintéticas
+        2. Cronometrar cada etapa do _append_clean do utils.data: juntar as entregas (concat_clean,
+           proporcional ao histórico), somar o cubo e somar os agregados (só as chaves do lote)
+
+        Input: Linhas do histórico e do lote
+        Output: Dicionário etapa -> segundos
+    """
+    raw = generate_raw( n_linhas + batch_rows )
+    df1 = clean_code( raw.iloc[:n_linhas].copy() )
+    df_novo = clean_code( raw.iloc[n_linhas:].copy() )
+    cube, cube_novo = build_cube( df1 ), build_cube( df_novo )
+    agregados, novos = build_aggregates( df1 ), build_aggregates( df_novo )
+
+    return {'concat_clean': _seconds( concat_clean, df1, df_novo ),
+            'merge_cube': _seconds( merge_cube, cube, cube_novo ),
+            'merge_aggregates': _seconds( merge_aggregates, agregados, novos )}
+
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.bench_append [tamanho do histórico ...]
+    sizes = [int( n ) for n in sys.argv[1:]] or SIZES
+
+    resultado = pd.DataFrame( {'{:,}'.format( n ): run( n ) for n in sizes} )
+    resultado.loc['total'] = resultado.sum()
+    print( 'lote de {:,} linhas (segundos por etapa)'.format( BATCH_ROWS ) )
+    print( resultado.to_string( float_format='{:.4f}'.format ) )
@@ -0,0 +1,85 @@
+# Libraries
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_raw
+from utils.backend import BACKENDS, filtered_aggregates, filtered_cube, filtered_plan, filtered_rows
+from utils.backend import filtered_weekly_orders, load_page_aggregates, load_page_data
+from utils.company import MAP_COLUMNS
+from utils.deliverers import PAGE_PLAN as DELIVERERS_PLAN
+from utils.restaurants import PAGE_PLAN as RESTAURANTS_PLAN
+from utils.snapshot import build_snapshot
+
+# Tamanhos padrão dos dados sintéticos
+SIZES = [100_000, 1_000_000]
+
+# Filtros de um rerun típico (data limite, opções de trânsito)
+DATE_SLIDER = pd.Timestamp( 2022, 4, 1 )
+TRAFFIC_OPTIONS = ['Low', 'Medium', 'High', 'Jam']
+
+# Execuções cronometradas por consulta (vale a menor)
+REPEATS = 3
+
+
+def _queries( backend, path ):
+    """ Consultas das três páginas num backend, como funções sem argumentos """
+    df1, cube, _ = load_page_data( path, backend=backend )
+    aggregates, _ = load_page_aggregates( path, backend=backend )
+    filtros = ( DATE_SLIDER, TRAFFIC_OPTIONS )
+
+    return {'cube': lambda: filtered_cube( cube, *filtros, backend=backend ),
+            'weekly_orders': lambda: filtered_weekly_orders( df1, *filtros, backend=backend ),
+            'rows[map]': lambda: filtered_rows( df1, MAP_COLUMNS, *filtros, backend=backend ),
+            'aggregates': lambda: filtered_aggregates( aggregates, *filtros, backend=backend ),
+            'plan[deliverers]': lambda: filtered_plan( df1, None, DELIVERERS_PLAN, *filtros, backend=backend ),
+            'plan[restaurants]': lambda: filtered_plan( df1, cube, RESTAURANTS_PLAN, *filtros, backend=backend )}
+
+
+def _seconds( func ):
+    """ Menor tempo (s) entre REPEATS execuções, depois de uma execução de aquecimento """
+    func()
+    tempos = []
+    for _ in range( REPEATS ):
+        inicio = time.perf_counter()
+        func()
+        tempos.append( time.perf_counter() - inicio )
+
+    return min( tempos )
+
+
+def run( n_linhas, backends=BACKENDS ):
+    """ Esta função tem a responsabilidade de comparar os backends nas consultas das páginas
+        Tipos de ações:
+        1. Gerar os dados sintéticos, gravar o CSV e o snapshot num diretório temporário
+        2. Cronometrar cada consulta das páginas em cada backend, com os mesmos filtros
+        3. Somar o tempo de um rerun completo (todas as consultas)
+
+        Input: Número de linhas e backends comparados
+        Output: Dataframe com os segundos por consulta (linhas) e backend (colunas)
+    """
+    with tempfile.TemporaryDirectory() as pasta:
+        path = os.path.join( pasta, 'train.csv' )
+        generate_raw( n_linhas ).to_csv( path, index=False )
+        build_snapshot( path )
+
+        resultado = {backend: {nome: _seconds( consulta ) for nome, consulta in _queries( backend, path ).items()}
+                     for backend in backends}
+
+    df_aux = pd.DataFrame( resultado )
+    df_aux.loc['total'] = df_aux.sum()
+
+    return df_aux
+
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.bench_backends [linhas ...]
+    # (as threads do Polars vêm do POLARS_MAX_THREADS, ou todas as CPUs)
+    sizes = [int( arg ) for arg in sys.argv[1:]] or SIZES
+
+    for n_linhas in sizes:
+        print( '{:,} linhas, {} CPUs'.format( n_linhas, os.cpu_count() ) )
+        print( run( n_linhas ).to_string( float_format='{:.4f}'.format ) )
@@ -0,0 +1,58 @@
+# Libraries
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_raw
+from utils.cleaning import CLEAN_STEPS
+
+# Tamanhos padrão: o arquivo do Kaggle (~45k) e volumes de crescimento
+SIZES = [45_000, 1_000_000, 10_000_000]
+
+
+def clean_code_legacy( df1 ):
+    """ Versão original do clean_code (uma cópia por coluna e apply linha a linha),
+        mantida aqui só como referência de comparação.
+    """
+    for col in ['Delivery_person_Age', 'Road_traffic_density', 'City', 'Festival', 'multiple_deliveries']:
+        df1 = df1.loc[df1[col] != 'NaN ', :].copy()
+
+    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].astype( 'int64' )
+    df1['multiple_deliveries'] = df1['multiple_deliveries'].astype( 'int64' )
+    df1['Delivery_person_Ratings'] = df1['Delivery_person_Ratings'].astype( float )
+    df1['Order_Date'] = pd.to_datetime( df1['Order_Date'], format='%d-%m-%Y' )
+
+    for col in ['ID', 'Road_traffic_density', 'Type_of_order', 'Type_of_vehicle', 'City', 'Festival']:
+        df1.loc[:, col] = df1.loc[:, col].str.strip()
+
+    df1['Time_taken(min)'] = df1['Time_taken(min)'].apply( lambda x: x.split( '(min) ' )[1] )
+    df1['Time_taken(min)'] = df1['Time_taken(min)'].astype( 'int64' )
+
+    return df1
+
+
+def run( n_linhas ):
+    """ Mede o tempo de cada etapa do clean_code e da versão original para um tamanho de dados """
+    raw = generate_raw( n_linhas )
+
+    tempos = {}
+    df1 = raw.copy()
+    for step in CLEAN_STEPS:
+        inicio = time.perf_counter()
+        df1 = step( df1 )
+        tempos[step.__name__] = time.perf_counter() - inicio
+    tempos['total'] = sum( tempos.values() )
+
+    inicio = time.perf_counter()
+    clean_code_legacy( raw.copy() )
+    tempos['legacy_total'] = time.perf_counter() - inicio
+
+    return tempos
+
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.bench_clean_code [tamanho ...]
+    sizes = [int( n ) for n in sys.argv[1:]] or SIZES
+    resultado = pd.DataFrame( {'{:,}'.format( n ): run( n ) for n in sizes} )
+    print( resultado.round( 4 ).to_string() )
@@ -0,0 +1,46 @@
+# Libraries
+import sys
+import timeit
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_raw
+from utils.cleaning import clean_code
+from utils.filters import apply_filters
+
+# Tamanhos padrão dos dados limpos
+SIZES = [45_000, 1_000_000]
+
+# Combinações de filtros típicas da barra lateral
+DATE_SLIDER = pd.Timestamp( 2022, 3, 20 )
+TRAFFIC_OPTIONS = [['Low', 'Medium', 'High', 'Jam'], ['Low', 'Jam']]
+
+
+def filters_legacy( df1, date_slider, traffic_options ):
+    """ Filtros originais das páginas (duas varreduras booleanas completas), para comparação """
+    df1 = df1.loc[df1['Order_Date'] < date_slider, :]
+    df1 = df1.loc[df1['Road_traffic_density'].astype( object ).isin( traffic_options ), :]
+
+    return df1
+
+
+def run( n_linhas, repeticoes=20 ):
+    """ Mede o tempo médio (ms) dos filtros originais e do apply_filters para um tamanho de dados """
+    df1 = clean_code( generate_raw( n_linhas ) )
+
+    tempos = {}
+    for traffic_options in TRAFFIC_OPTIONS:
+        nome = '+'.join( traffic_options )
+        for func in ( filters_legacy, apply_filters ):
+            segundos = timeit.timeit( lambda: func( df1, DATE_SLIDER, traffic_options ), number=repeticoes )
+            tempos['{} [{}]'.format( func.__name__, nome )] = 1000 * segundos / repeticoes
+
+    return tempos
+
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.bench_filters [tamanho ...]
+    sizes = [int( n ) for n in sys.argv[1:]] or SIZES
+    resultado = pd.DataFrame( {'{:,}'.format( n ): run( n ) for n in sizes} )
+    print( 'Tempo médio por chamada (ms)' )
+    print( resultado.round( 3 ).to_string() )
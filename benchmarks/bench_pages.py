@@ -0,0 +1,139 @@
+# Libraries
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import folium
+import pandas as pd
+
+from benchmarks.synthetic import generate_raw
+from utils.cleaning import clean_code
+from utils.company import country_maps, order_by_week, order_metric, order_share_by_week, weekly_orders
+from utils.cube import build_cube
+from utils.deliverers import PAGE_PLAN as DELIVERERS_PLAN, deliverer_profiles, top_delivers
+from utils.plan import run_plan
+from utils.restaurants import PAGE_PLAN as RESTAURANTS_PLAN
+from utils.restaurants import avg_std_time_delivery, avg_std_time_graph, avg_std_time_on_traffic, distance
+from utils.streaming import build_aggregates
+
+# Tamanhos padrão dos dados sintéticos
+SIZES = [100_000, 1_000_000, 10_000_000]
+
+# Arquivo padrão dos resultados
+OUTPUT_PATH = 'bench_pages.json'
+
+
+def _measure( func, *args, setup=None ):
+    """ Roda a função duas vezes: primeiro com o tracemalloc ligado, para o pico de memória (essa
+        execução também aquece imports e caches), e depois só cronometrada, já que o tracemalloc
+        deixa as alocações mais lentas. 'setup', se informado, monta os argumentos de cada
+        execução fora da medição.
+    """
+    argumentos = setup() if setup else args
+    tracemalloc.start()
+    func( *argumentos )
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    argumentos = setup() if setup else args
+    inicio = time.perf_counter()
+    func( *argumentos )
+    segundos = time.perf_counter() - inicio
+
+    return {'seconds': segundos, 'peak_bytes': pico}
+
+
+def _render_map( df1, pontos ):
+    """ Monta o mapa e serializa o HTML, como a página faz antes de enviar ao navegador """
+    return folium.Figure().add_child( country_maps( df1, pontos ) ).render()
+
+
+def run( n_linhas, seed=42 ):
+    """ Esta função tem a responsabilidade de medir as funções das páginas para um tamanho de dados
+        Tipos de ações:
+        1. Gerar os dados brutos sintéticos (com 'NaN ' e '(min) ')
+        2. Medir o clean_code, o cubo de KPIs e os agregados materializados
+        3. Medir os planos de agregação das páginas e as funções que usam as tabelas deles
+        4. Medir os gráficos da Visão Empresa e o mapa (medianas e com os pontos)
+
+        Input: Número de linhas e semente
+        Output: Dicionário nome da função -> {'seconds', 'peak_bytes'}
+    """
+    raw = generate_raw( n_linhas, seed=seed )
+
+    resultado = {}
+    resultado['clean_code'] = _measure( clean_code, setup=lambda: ( raw.copy(), ) )
+    df1 = clean_code( raw )
+    del raw
+
+    resultado['build_cube'] = _measure( build_cube, df1 )
+    cube = build_cube( df1 )
+    resultado['build_aggregates'] = _measure( build_aggregates, df1 )
+    agregados = build_aggregates( df1 )
+
+    resultado['run_plan[deliverers]'] = _measure( run_plan, df1, DELIVERERS_PLAN )
+    resultado['run_plan[deliverers, aggregates]'] = _measure( run_plan, None, DELIVERERS_PLAN, None, agregados )
+    resultado['deliverer_profiles'] = _measure( deliverer_profiles, agregados['deliverers'], agregados['deliverer_mix'] )
+    resultado['run_plan[restaurants]'] = _measure( run_plan, df1, RESTAURANTS_PLAN, cube )
+    tabelas = {**run_plan( df1, DELIVERERS_PLAN ), **run_plan( df1, RESTAURANTS_PLAN, cube )}
+
+    resultado['top_delivers'] = _measure( top_delivers, tabelas['tempo_entregador'] )
+    resultado['distance'] = _measure( distance, tabelas, False )
+    resultado['distance[fig]'] = _measure( distance, tabelas, True )
+    resultado['avg_std_time_delivery'] = _measure( avg_std_time_delivery, tabelas['tempo_festival'], 'Yes', 'avg_time' )
+    resultado['avg_std_time_graph'] = _measure( avg_std_time_graph, tabelas['tempo_cidade'] )
+    resultado['avg_std_time_on_traffic'] = _measure( avg_std_time_on_traffic, tabelas['tempo_cidade_transito'] )
+
+    resultado['order_metric'] = _measure( order_metric, cube )
+    resultado['weekly_orders'] = _measure( weekly_orders, df1 )
+    semanas = weekly_orders( df1 )
+    resultado['order_by_week'] = _measure( order_by_week, semanas )
+    resultado['order_share_by_week'] = _measure( order_share_by_week, semanas )
+    resultado['country_maps'] = _measure( _render_map, df1, False )
+    resultado['country_maps[pontos]'] = _measure( _render_map, df1, True )
+
+    return resultado
+
+
+def _commit():
+    """ Commit atual do repositório (None fora de um checkout do git) """
+    try:
+        return subprocess.run( ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                               check=True ).stdout.strip()
+    except ( OSError, subprocess.CalledProcessError ):
+        return None
+
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.bench_pages [tamanho ...] [--output bench_pages.json] [--seed 42]
+    parser = argparse.ArgumentParser( description='Tempo e pico de memória das funções das páginas' )
+    parser.add_argument( 'sizes', nargs='*', type=int, default=SIZES )
+    parser.add_argument( '--output', default=OUTPUT_PATH )
+    parser.add_argument( '--seed', type=int, default=42 )
+    args = parser.parse_args()
+
+    resultados = {str( n ): run( n, seed=args.seed ) for n in args.sizes}
+
+    relatorio = {
+        'commit': _commit(),
+        'date': datetime.datetime.now().isoformat( timespec='seconds' ),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'seed': args.seed,
+        'streamlit_imported': 'streamlit' in sys.modules,
+        'results': resultados,
+    }
+    with open( args.output, 'w' ) as arquivo:
+        json.dump( relatorio, arquivo, indent=2 )
+
+    for metrica, escala, titulo in ( ( 'seconds', 1000, 'Tempo (ms)' ), ( 'peak_bytes', 2 ** -20, 'Pico de memória (MiB)' ) ):
+        tabela = pd.DataFrame( {'{:,}'.format( int( n ) ): {nome: medida[metrica] * escala for nome, medida in r.items()}
+                                for n, r in resultados.items()} ).reindex( list( next( iter( resultados.values() ) ) ) )
+        print( titulo )
+        print( tabela.round( 2 ).to_string() )
+    print( 'Resultados gravados em {}'.format( args.output ) )
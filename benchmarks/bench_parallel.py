@@ -0,0 +1,60 @@
+# Libraries
+import os
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_raw
+from utils.cleaning import clean_code
+from utils.parallel import parallel_ingest
+
+# Tamanho padrão dos dados sintéticos
+SIZE = 2_000_000
+
+
+def _seconds( func, *args, **kwargs ):
+    """ Tempo (s) de uma chamada e o seu resultado """
+    inicio = time.perf_counter()
+    resultado = func( *args, **kwargs )
+
+    return time.perf_counter() - inicio, resultado
+
+
+def run( n_linhas, max_workers=None, partition='date' ):
+    """ Esta função tem a responsabilidade de medir a escala da limpeza em vários processos
+        Tipos de ações:
+        1. Cronometrar o clean_code num único processo (referência)
+        2. Cronometrar o parallel_ingest (limpeza + cubo + agregados) de 1 a max_workers processos
+        3. Conferir se o dataframe limpo é idêntico ao da referência
+
+        Input: Número de linhas, máximo de processos (padrão: os.cpu_count()) e modo de partição
+        Output: Dataframe com tempo, aceleração e conferência por número de processos
+    """
+    max_workers = max_workers or os.cpu_count()
+    df_raw = generate_raw( n_linhas )
+
+    serial, referencia = _seconds( clean_code, df_raw.copy() )
+    resultado = {'clean_code': {'seconds': serial, 'speedup': 1.0, 'identical': True}}
+    for workers in range( 1, max_workers + 1 ):
+        segundos, ( df1, _ ) = _seconds( parallel_ingest, df_raw, workers, partition )
+        if partition == 'city':
+            df1 = df1.sort_values( ['Order_Date', 'ID'] ).reset_index( drop=True )
+            iguais = df1.astype( str ).equals(
+                referencia.sort_values( ['Order_Date', 'ID'] ).reset_index( drop=True ).astype( str ) )
+        else:
+            iguais = df1.equals( referencia )
+        resultado['parallel_ingest [{}]'.format( workers )] = {'seconds': segundos, 'speedup': serial / segundos,
+                                                               'identical': iguais}
+
+    return pd.DataFrame( resultado ).T
+
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.bench_parallel [linhas] [máximo de processos] [date|city]
+    n_linhas = int( sys.argv[1] ) if len( sys.argv ) > 1 else SIZE
+    max_workers = int( sys.argv[2] ) if len( sys.argv ) > 2 else None
+    partition = sys.argv[3] if len( sys.argv ) > 3 else 'date'
+
+    print( '{:,} linhas, {} CPUs'.format( n_linhas, os.cpu_count() ) )
+    print( run( n_linhas, max_workers, partition ).to_string() )
@@ -0,0 +1,84 @@
+# Libraries
+import sys
+import tracemalloc
+
+import pandas as pd
+
+from utils.backend import filtered_plan, filtered_rows, filtered_weekly_orders
+from utils.company import MAP_COLUMNS
+from utils.data import DATA_PATH, load_dataset
+from utils.restaurants import PAGE_PLAN as RESTAURANTS_PLAN
+
+# Números de sessões simultâneas medidos
+SESSIONS = [1, 2, 4, 8, 16]
+
+# Filtros de cada sessão (data limite, opções de trânsito), em rodízio
+FILTERS = [( pd.Timestamp( 2022, 4, 1 ), ['Low', 'Medium', 'High', 'Jam'] ),
+           ( pd.Timestamp( 2022, 3, 20 ), ['Low', 'Jam'] ),
+           ( pd.Timestamp( 2022, 3, 1 ), ['High'] )]
+
+# Memória extra por sessão tolerada, como fração dos bytes do dataframe limpo
+MAX_GROWTH = 0.01
+
+
+def _session( i, path, deep ):
+    """ Um rerun de uma sessão: carrega os dados e consulta mapa, semanas e plano com os filtros da
+        sessão. Devolve o que a sessão mantém entre reruns (dados e cubo); com 'deep', como antes,
+        cada sessão recebe a sua própria cópia dos dados.
+    """
+    df1, cube, _ = load_dataset( path )
+    if deep:
+        df1, cube = df1.copy(), cube.copy()
+
+    date_slider, traffic_options = FILTERS[i % len( FILTERS )]
+    filtered_rows( df1, MAP_COLUMNS, date_slider, traffic_options, backend='pandas' )
+    filtered_weekly_orders( df1, date_slider, traffic_options, backend='pandas' )
+    filtered_plan( df1, cube, RESTAURANTS_PLAN, date_slider, traffic_options, backend='pandas' )
+
+    return df1, cube
+
+
+def run( path=DATA_PATH, sessions=SESSIONS ):
+    """ Esta função tem a responsabilidade de medir a memória das sessões simultâneas
+        Tipos de ações:
+        1. Carregar os dados uma vez (fora da medição), como o primeiro rerun do processo
+        2. Para cada número de sessões, rodar um rerun por sessão e manter o que cada uma guarda
+        3. Medir com o tracemalloc os bytes alocados que continuam vivos, com os dados compartilhados
+           e com uma cópia por sessão (o comportamento antigo), para comparação
+
+        Input: Caminho do arquivo CSV e números de sessões
+        Output: Dataframe com os bytes retidos por número de sessões (linhas) e modo (colunas)
+    """
+    df1, _, _ = load_dataset( path )
+    resultado = {}
+    for deep in ( False, True ):
+        modo = 'copied' if deep else 'shared'
+        resultado[modo] = {}
+        for n in sessions:
+            tracemalloc.start()
+            base, _ = tracemalloc.get_traced_memory()
+            mantidos = [_session( i, path, deep ) for i in range( n )]
+            atual, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            resultado[modo][n] = atual - base
+            del mantidos
+
+    df_aux = pd.DataFrame( resultado )
+    df_aux.index.name = 'sessions'
+    df_aux.attrs['dataset_bytes'] = int( df1.memory_usage( index=False, deep=True ).sum() )
+
+    return df_aux
+
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.bench_sessions_memory [train.csv]
+    path = sys.argv[1] if len( sys.argv ) > 1 else DATA_PATH
+
+    df_aux = run( path )
+    dataset = df_aux.attrs['dataset_bytes']
+    por_sessao = ( df_aux['shared'].iloc[-1] - df_aux['shared'].iloc[0] ) / ( df_aux.index[-1] - df_aux.index[0] )
+    print( df_aux.to_string() )
+    print( 'dataframe limpo: {:,} bytes; memória extra por sessão (shared): {:,.0f} bytes ({:.2%})'.format(
+        dataset, por_sessao, por_sessao / dataset ) )
+
+    sys.exit( 0 if por_sessao <= MAX_GROWTH * dataset else 1 )
@@ -0,0 +1,65 @@
+# Libraries
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_raw
+from utils.cleaning import clean_code
+from utils.streaming import stream_ingest
+
+# Tamanhos padrão do CSV sintético e linhas por pedaço da ingestão em streaming
+SIZES = [1_000_000, 4_000_000]
+CHUNK_SIZES = [100_000, 500_000]
+
+
+def _peak( func, *args ):
+    """ Tempo (s) e pico de memória (MiB) de uma chamada, medidos juntos com o tracemalloc, e o resultado """
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = func( *args )
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'seconds': segundos, 'peak_mib': pico / 2 ** 20}, resultado
+
+
+def _sizes( agregados ):
+    """ Linhas do agregado 'deliverers' e MiB de todos os agregados juntos """
+    return {'deliverers_rows': len( agregados['deliverers'] ),
+            'aggregates_mib': sum( df_aux.memory_usage( index=False, deep=True ).sum()
+                                   for nome, df_aux in agregados.items() if nome != 'rows' ) / 2 ** 20}
+
+
+def _full_load( csv_path ):
+    """ Ingestão original: o CSV inteiro em memória antes do clean_code """
+    return clean_code( pd.read_csv( csv_path ) )
+
+
+def run( n_linhas, chunk_sizes=CHUNK_SIZES ):
+    """ Compara o pico de memória da leitura completa com o da ingestão em streaming. Os entregadores
+        crescem com as linhas (um a cada ~30 entregas, o padrão do generate_raw), então o agregado
+        'deliverers' também cresce: o tamanho dele entra no relatório.
+    """
+    with tempfile.TemporaryDirectory() as pasta:
+        csv_path = os.path.join( pasta, 'train.csv' )
+        generate_raw( n_linhas ).to_csv( csv_path, index=False )
+
+        resultado = {'read_csv + clean_code': _peak( _full_load, csv_path )[0]}
+        for chunksize in chunk_sizes:
+            medidas, agregados = _peak( stream_ingest, csv_path, chunksize )
+            resultado['stream_ingest [{:,}]'.format( chunksize )] = {**medidas, **_sizes( agregados )}
+
+    return resultado
+
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.bench_streaming [tamanho ...]
+    sizes = [int( n ) for n in sys.argv[1:]] or SIZES
+    for n in sizes:
+        print( '{:,} linhas'.format( n ) )
+        print( pd.DataFrame( run( n ) ).T.round( 2 ).to_string() )
@@ -0,0 +1,101 @@
+# Libraries
+import sys
+
+import numpy as np
+import pandas as pd
+
+from utils.backend import BACKENDS, filtered_aggregates, filtered_cube, filtered_plan, filtered_rows
+from utils.backend import filtered_weekly_orders, load_page_aggregates, load_page_data
+from utils.company import MAP_COLUMNS
+from utils.data import DATA_PATH
+from utils.deliverers import PAGE_PLAN as DELIVERERS_PLAN
+from utils.restaurants import PAGE_PLAN as RESTAURANTS_PLAN
+
+# Combinações de filtros conferidas (data limite, opções de trânsito), inclusive sem nenhum trânsito
+FILTERS = [( pd.Timestamp( 2022, 3, 20 ), ['Low', 'Jam', 'High'] ),
+           ( pd.Timestamp( 2022, 4, 13 ), ['Low', 'Medium', 'High', 'Jam'] ),
+           ( pd.Timestamp( 2022, 2, 11 ), ['Jam'] ),
+           ( pd.Timestamp( 2022, 3, 1 ), [] )]
+
+# Tolerância relativa das colunas numéricas (a ordem das somas muda entre as engines)
+RTOL = 1e-6
+
+
+def _differences( esperado, obtido ):
+    """ Diferenças entre duas tabelas: colunas, linhas, valores e categorias (vazio se forem iguais) """
+    esperado = esperado.reset_index( drop=True )
+    obtido = obtido.reset_index( drop=True )
+    if list( esperado.columns ) != list( obtido.columns ):
+        return ['colunas {} != {}'.format( list( esperado.columns ), list( obtido.columns ) )]
+    if len( esperado ) != len( obtido ):
+        return ['{} linhas != {}'.format( len( esperado ), len( obtido ) )]
+
+    diferencas = []
+    for col in esperado.columns:
+        a, b = esperado[col], obtido[col]
+        if a.dtype.kind in 'fiu' and b.dtype.kind in 'fiu':
+            iguais = np.allclose( a.astype( float ), b.astype( float ), rtol=RTOL, equal_nan=True )
+        else:
+            iguais = ( a.astype( str ).to_numpy() == b.astype( str ).to_numpy() ).all()
+        if iguais and isinstance( a.dtype, pd.CategoricalDtype ):
+            iguais = isinstance( b.dtype, pd.CategoricalDtype ) and list( a.cat.categories ) == list( b.cat.categories )
+        if not iguais:
+            diferencas.append( 'coluna {}'.format( col ) )
+
+    return diferencas
+
+
+def _results( backend, path ):
+    """ Todas as consultas das páginas num backend, para cada combinação de FILTERS """
+    df1, cube, _ = load_page_data( path, backend=backend )
+    aggregates, _ = load_page_aggregates( path, backend=backend )
+
+    resultados = {}
+    for date_slider, traffic_options in FILTERS:
+        filtro = '{} {}'.format( date_slider.date(), traffic_options )
+        resultados[filtro + ' cube'] = filtered_cube( cube, date_slider, traffic_options, backend=backend )
+        resultados[filtro + ' weekly_orders'] = filtered_weekly_orders( df1, date_slider, traffic_options, backend=backend )
+        # no pandas vêm todas as colunas, nas engines só as do mapa; a ordem das linhas não é garantida
+        linhas = filtered_rows( df1, MAP_COLUMNS, date_slider, traffic_options, backend=backend )
+        resultados[filtro + ' rows'] = linhas.loc[:, MAP_COLUMNS].sort_values( MAP_COLUMNS, kind='mergesort' )
+        for nome, df_aux in filtered_aggregates( aggregates, date_slider, traffic_options, backend=backend ).items():
+            resultados['{} aggregates[{}]'.format( filtro, nome )] = df_aux
+        for pagina, plan, cube_aux in [( 'deliverers', DELIVERERS_PLAN, None ), ( 'restaurants', RESTAURANTS_PLAN, cube )]:
+            for nome, df_aux in filtered_plan( df1, cube_aux, plan, date_slider, traffic_options,
+                                               backend=backend ).items():
+                resultados['{} plan[{}.{}]'.format( filtro, pagina, nome )] = df_aux
+
+    return resultados
+
+
+def run( path=DATA_PATH, backends=BACKENDS[1:] ):
+    """ Esta função tem a responsabilidade de conferir se as engines devolvem o mesmo que o pandas
+        Tipos de ações:
+        1. Calcular todas as consultas das páginas no pandas (referência)
+        2. Calcular as mesmas consultas em cada engine, com os mesmos filtros
+        3. Comparar colunas, linhas, valores (com tolerância RTOL) e categorias
+
+        Input: Caminho do arquivo CSV e backends conferidos
+        Output: Dicionário backend -> lista de diferenças ('consulta: diferença')
+    """
+    referencia = _results( 'pandas', path )
+    resultado = {}
+    for backend in backends:
+        obtido = _results( backend, path )
+        resultado[backend] = ['{}: {}'.format( consulta, diferenca ) for consulta in referencia
+                              for diferenca in _differences( referencia[consulta], obtido[consulta] )]
+
+    return resultado
+
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.engine_parity [backend ...]
+    backends = sys.argv[1:] or BACKENDS[1:]
+
+    diferencas = run( DATA_PATH, backends )
+    for backend, lista in diferencas.items():
+        print( '{}: {}'.format( backend, 'ok' if not lista else '{} diferenças'.format( len( lista ) ) ) )
+        for diferenca in lista:
+            print( '    ' + diferenca )
+
+    sys.exit( 1 if any( diferencas.values() ) else 0 )
@@ -0,0 +1,89 @@
+# Libraries
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+# Páginas medidas por padrão
+PAGES = ['Home.py'] + sorted( glob.glob( 'pages/*.py' ) )
+
+# Bibliotecas pesadas acompanhadas no relatório (tempo acumulado da primeira importação)
+HEAVY_MODULES = ['plotly.express', 'plotly.graph_objects', 'folium', 'folium.plugins', 'PIL.Image', 'polars', 'duckdb']
+
+# Número de importações de primeiro nível listadas por página
+TOP = 10
+
+
+def _import_times( stderr ):
+    """ Linhas do -X importtime: (próprio em µs, acumulado em µs, profundidade, módulo) """
+    linhas = []
+    for linha in stderr.splitlines():
+        if not linha.startswith( 'import time:' ) or 'cumulative' in linha:
+            continue
+        proprio, acumulado, nome = linha[len( 'import time:' ):].split( '|' )
+        profundidade = ( len( nome ) - len( nome.lstrip() ) - 1 ) // 2
+        linhas.append( ( int( proprio ), int( acumulado ), profundidade, nome.strip() ) )
+
+    return linhas
+
+
+def profile_page( page ):
+    """ Esta função tem a responsabilidade de medir as importações de uma página num processo novo
+        Tipos de ações:
+        1. Rodar a página com python -X importtime (modo 'bare' do Streamlit: importações e o
+           primeiro rerun, com os widgets nos valores padrão, como num worker recém-iniciado)
+        2. Somar o tempo de todas as importações e separar o das bibliotecas de HEAVY_MODULES
+        3. Listar as importações de primeiro nível mais caras
+
+        Input: Caminho da página
+        Output: Tupla (dicionário com 'wall_s', 'import_ms' e os ms de cada biblioteca pesada,
+                dataframe das TOP importações de primeiro nível)
+    """
+    env = dict( os.environ, PYTHONPATH=os.pathsep.join( filter( None, ['.', os.environ.get( 'PYTHONPATH' )] ) ) )
+    inicio = time.perf_counter()
+    processo = subprocess.run( [sys.executable, '-X', 'importtime', page], capture_output=True, text=True, env=env )
+    segundos = time.perf_counter() - inicio
+    if processo.returncode != 0:
+        raise RuntimeError( 'A página {} terminou com erro:\n{}'.format( page, processo.stderr[-2000:] ) )
+
+    linhas = _import_times( processo.stderr )
+    resumo = {'wall_s': segundos, 'import_ms': sum( proprio for proprio, _, _, _ in linhas ) / 1000}
+    for proprio, acumulado, _, nome in linhas:
+        if nome in HEAVY_MODULES:
+            resumo[nome] = acumulado / 1000
+
+    primeiro_nivel = pd.DataFrame( [( nome, acumulado / 1000 ) for _, acumulado, profundidade, nome in linhas
+                                    if profundidade == 0], columns=['module', 'cumulative_ms'] )
+
+    return resumo, primeiro_nivel.nlargest( TOP, 'cumulative_ms' ).reset_index( drop=True )
+
+
+def run( pages=PAGES ):
+    """ Relatório de importações por página: uma linha por página, com tempo total, tempo das
+        importações e das bibliotecas pesadas (vazio = a página não importou a biblioteca)
+    """
+    resumos = {}
+    primeiros = {}
+    for page in pages:
+        resumos[page], primeiros[page] = profile_page( page )
+
+    return pd.DataFrame( resumos ).T.reindex( columns=['wall_s', 'import_ms'] + HEAVY_MODULES ), primeiros
+
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.import_report [páginas ...] [--top]
+    parser = argparse.ArgumentParser( description='Tempo de importação por página (python -X importtime)' )
+    parser.add_argument( 'pages', nargs='*', default=PAGES )
+    parser.add_argument( '--top', action='store_true', help='listar as importações de primeiro nível mais caras' )
+    args = parser.parse_args()
+
+    relatorio, primeiros = run( args.pages )
+    print( relatorio.to_string( float_format='{:.1f}'.format, na_rep='-' ) )
+    if args.top:
+        for page, df_aux in primeiros.items():
+            print( '\n' + page )
+            print( df_aux.to_string( float_format='{:.1f}'.format ) )
@@ -0,0 +1,211 @@
+# Libraries
+import argparse
+import datetime
+import glob
+import json
+import random
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+from streamlit import config, source_util
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.proto.WidgetStates_pb2 import WidgetStates
+from streamlit.runtime.scriptrunner import RerunData, ScriptRunnerEvent
+from streamlit.testing.element_tree import Multiselect, Radio, Slider
+from streamlit.testing.local_script_runner import LocalScriptRunner
+
+# Páginas testadas por padrão
+PAGES = sorted( glob.glob( 'pages/*.py' ) )
+
+# Opções do filtro de trânsito da barra lateral
+TRAFFIC_OPTIONS = ['Low', 'Medium', 'High', 'Jam']
+
+# Eventos que encerram um rerun
+STOP_EVENTS = ( ScriptRunnerEvent.SCRIPT_STOPPED_WITH_SUCCESS, ScriptRunnerEvent.SCRIPT_STOPPED_WITH_COMPILE_ERROR,
+                ScriptRunnerEvent.SCRIPT_STOPPED_FOR_RERUN )
+
+
+def _start_runtime():
+    """ Runtime mínimo em memória, o mesmo usado pelos testes do próprio Streamlit: sem ele o
+        st.cache_data não guarda nada e cada rerun recalcularia tudo.
+    """
+    config.set_option( 'runner.postScriptGC', False )
+    runtime = MagicMock( spec=Runtime )
+    runtime.media_file_mgr = MediaFileManager( MemoryMediaFileStorage( '/mock/media' ) )
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+
+
+def _read_messages( runner ):
+    """ Lê das mensagens do rerun os widgets da barra lateral, o seletor de abas (o primeiro radio)
+        e o número de exceções.
+        (a árvore de elementos do streamlit.testing desta versão não suporta st.container)
+    """
+    widgets = {}
+    erros = 0
+    for msg in runner.forward_msgs():
+        if msg.WhichOneof( 'type' ) != 'delta' or msg.delta.WhichOneof( 'type' ) != 'new_element':
+            continue
+        elemento = msg.delta.new_element
+        tipo = elemento.WhichOneof( 'type' )
+        if tipo in ( 'slider', 'multiselect', 'radio' ):
+            widgets.setdefault( tipo, getattr( elemento, tipo ) )
+        elif tipo == 'exception':
+            erros += 1
+
+    return widgets, erros
+
+
+def rerun( script_path, session_state=None, widget_states=None, timeout=120 ):
+    """ Esta função tem a responsabilidade de executar um rerun da página, como o servidor faz
+        Tipos de ações:
+        1. Criar o script runner com o estado da sessão e os valores dos widgets
+        2. Cronometrar do pedido de rerun até o evento de fim do script
+        3. Ler os widgets e as exceções das mensagens geradas
+
+        Input: Caminho da página, estado da sessão, estados dos widgets e tempo limite (s)
+        Output: Tupla (estado da sessão, widgets da barra lateral, número de exceções, latência em segundos)
+    """
+    runner = LocalScriptRunner( script_path, session_state )
+    terminou = threading.Event()
+
+    def on_event( sender, event, **kwargs ):
+        if event in STOP_EVENTS:
+            terminou.set()
+
+    runner.on_event.connect( on_event, weak=False )
+    inicio = time.perf_counter()
+    runner.request_rerun( RerunData( widget_states=widget_states ) )
+    runner.start()
+    if not terminou.wait( timeout ):
+        runner.request_stop()
+        runner.join()
+        raise RuntimeError( 'Rerun de {} passou de {} s'.format( script_path, timeout ) )
+    latencia = time.perf_counter() - inicio
+    runner.join()
+
+    widgets, erros = _read_messages( runner )
+
+    return runner.session_state, widgets, erros, latencia
+
+
+def _micros_to_datetime( micros ):
+    return datetime.datetime( 1970, 1, 1 ) + datetime.timedelta( microseconds=micros )
+
+
+def _interact( slider, multiselect, abas, rng ):
+    """ Simula o gerente: move o slider de data, liga/desliga um trânsito (sempre sobra ao menos uma
+        opção marcada) ou, nas páginas com seletor de abas, troca de aba
+    """
+    sorteio = rng.random()
+    if abas is not None and sorteio < 0.25:
+        abas.set_value( rng.choice( abas.options ) )
+    elif sorteio < 0.6:
+        dias = int( ( slider.max_value - slider.min_value ) // 86_400_000_000 )
+        slider.set_value( _micros_to_datetime( slider.min_value ) + datetime.timedelta( days=rng.randint( 0, dias ) ) )
+    else:
+        marcados = list( multiselect.value )
+        opcao = rng.choice( TRAFFIC_OPTIONS )
+        if opcao in marcados and len( marcados ) > 1:
+            marcados.remove( opcao )
+        elif opcao not in marcados:
+            marcados.append( opcao )
+        multiselect.set_value( marcados )
+
+    widget_states = WidgetStates()
+    widget_states.widgets.extend( [slider.widget_state(), multiselect.widget_state()] )
+    if abas is not None:
+        widget_states.widgets.append( abas.widget_state() )
+
+    return widget_states
+
+
+def _session( script_path, session_state, widgets, n_reruns, seed, latencias, erros ):
+    """ Uma sessão: n_reruns interações seguidas, cada uma com o estado deixado pela anterior """
+    rng = random.Random( seed )
+    slider = Slider( widgets['slider'], None ).set_value( _micros_to_datetime( widgets['slider'].default[0] ) )
+    multiselect = Multiselect( widgets['multiselect'], None )
+    multiselect.set_value( [multiselect.options[i] for i in widgets['multiselect'].default] )
+    abas = None
+    if 'radio' in widgets:
+        abas = Radio( widgets['radio'], None )
+        abas.set_value( abas.options[widgets['radio'].default] )
+    for _ in range( n_reruns ):
+        widget_states = _interact( slider, multiselect, abas, rng )
+        session_state, _, n_erros, latencia = rerun( script_path, session_state, widget_states )
+        latencias.append( latencia )
+        erros.append( n_erros )
+
+
+def run( script_path, n_sessions, n_reruns, seed=42 ):
+    """ Esta função tem a responsabilidade de simular várias sessões simultâneas numa página
+        Tipos de ações:
+        1. Fazer um primeiro rerun (partida a frio: carga dos dados) fora das estatísticas
+        2. Abrir n_sessions threads, cada uma mudando os filtros e pedindo n_reruns reruns
+        3. Calcular os percentis de latência e a vazão (reruns por segundo)
+
+        Input: Caminho da página, número de sessões, reruns por sessão e semente
+        Output: Dicionário com as estatísticas da página
+    """
+    # o Streamlit guarda as páginas do app da primeira página executada; sem limpar, um rerun sem
+    # página escolhida executaria a página testada antes
+    with source_util._pages_cache_lock:
+        source_util._cached_pages = None
+
+    session_state, widgets, n_erros, partida = rerun( script_path )
+    if n_erros or not {'slider', 'multiselect'} <= set( widgets ):
+        raise RuntimeError( '{} não rodou ou não tem os filtros da barra lateral'.format( script_path ) )
+
+    latencias = []
+    erros = []
+    sessoes = [threading.Thread( target=_session, args=( script_path, session_state, widgets, n_reruns, seed + i,
+                                                              latencias, erros ) )
+               for i in range( n_sessions )]
+    inicio = time.perf_counter()
+    for sessao in sessoes:
+        sessao.start()
+    for sessao in sessoes:
+        sessao.join()
+    duracao = time.perf_counter() - inicio
+
+    p50, p95, p99 = np.percentile( np.array( latencias ) * 1000, [50, 95, 99] ) if latencias else ( np.nan, ) * 3
+
+    return {'sessions': n_sessions, 'reruns': len( latencias ), 'errors': int( sum( erros ) ),
+            'cold_start_ms': partida * 1000, 'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99,
+            'throughput_rps': len( latencias ) / duracao}
+
+
+if __name__ == '__main__':
+    # Uso (na raiz do repositório):
+    # python -m benchmarks.load_test [página ...] [--sessions 8] [--reruns 20] [--budget-p95 ms] [--output arq.json]
+    parser = argparse.ArgumentParser( description='Teste de carga de reruns com sessões simultâneas' )
+    parser.add_argument( 'pages', nargs='*', default=PAGES )
+    parser.add_argument( '--sessions', type=int, default=8 )
+    parser.add_argument( '--reruns', type=int, default=20 )
+    parser.add_argument( '--seed', type=int, default=42 )
+    parser.add_argument( '--budget-p95', type=float, default=None, help='latência p95 máxima (ms) por página' )
+    parser.add_argument( '--output', default=None )
+    args = parser.parse_args()
+
+    _start_runtime()
+    resultado = {pagina: run( pagina, args.sessions, args.reruns, args.seed ) for pagina in args.pages}
+
+    tabela = pd.DataFrame( resultado ).T
+    print( tabela.round( 1 ).to_string() )
+    if args.output:
+        with open( args.output, 'w' ) as arquivo:
+            json.dump( resultado, arquivo, indent=2 )
+
+    # Orçamento de latência: sai com erro se alguma página passar do p95 ou tiver reruns com exceção
+    estourou = [pagina for pagina, r in resultado.items()
+                if r['errors'] > 0 or ( args.budget_p95 is not None and r['p95_ms'] > args.budget_p95 )]
+    if estourou:
+        print( 'Fora do orçamento: {}'.format( ', '.join( estourou ) ) )
+        sys.exit( 1 )
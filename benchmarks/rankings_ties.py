@@ -0,0 +1,63 @@
+# Libraries
+import sys
+
+import numpy as np
+import pandas as pd
+
+from utils.rankings import top_k_per_group
+
+# Cidades, entregadores por cidade e k conferidos
+CITIES = ['Metropolitian', 'Urban', 'Semi-Urban']
+N_DELIVERERS = 40
+K = 10
+
+
+def _table( seed ):
+    """ Tabela no formato do 'tempo_entregador', ordenada por cidade e entregador, com poucas médias
+        distintas: muitos entregadores empatados no corte dos k mais rápidos e dos k mais lentos
+    """
+    rng = np.random.default_rng( seed )
+    df_aux = pd.DataFrame( {'City': np.repeat( CITIES, N_DELIVERERS ),
+                            'Delivery_person_ID': ['DEL{:03d}'.format( i ) for i in range( N_DELIVERERS )] * len( CITIES ),
+                            'Time_taken(min)': rng.integers( 20, 25, N_DELIVERERS * len( CITIES ) ).astype( 'float64' ),
+                            'count': 1} )
+    df_aux['City'] = pd.Categorical( df_aux['City'], categories=CITIES )
+
+    return df_aux
+
+
+def _baseline( df_aux, ascending ):
+    """ Seleção original da página: ordenação estável por cidade e tempo, k primeiros de cada cidade """
+    df_aux = df_aux.sort_values( ['City', 'Time_taken(min)'], ascending=ascending ).reset_index( drop=True )
+
+    return pd.concat( [df_aux.loc[df_aux['City'] == cidade].head( K ) for cidade in CITIES] ).reset_index( drop=True )
+
+
+def run( seeds=range( 20 ) ):
+    """ Esta função tem a responsabilidade de conferir os empates do top_k_per_group
+        Tipos de ações:
+        1. Montar tabelas com médias empatadas no corte dos k
+        2. Comparar os k menores e os k maiores por cidade com a seleção original (entregadores
+           empatados em ordem crescente de ID, nos dois lados)
+
+        Input: Sementes das tabelas sorteadas
+        Output: Lista de diferenças (vazia se tudo bater)
+    """
+    diferencas = []
+    for seed in seeds:
+        df_aux = _table( seed )
+        menores, maiores = top_k_per_group( df_aux, 'City', 'Time_taken(min)', k=K, group_order=CITIES )
+        for lado, obtido, ascending in [( 'menores', menores, True ), ( 'maiores', maiores, False )]:
+            esperado = _baseline( df_aux, ascending )
+            if not obtido['Delivery_person_ID'].tolist() == esperado['Delivery_person_ID'].tolist():
+                diferencas.append( 'semente {}: {}'.format( seed, lado ) )
+
+    return diferencas
+
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.rankings_ties
+    diferencas = run()
+    print( 'ok' if not diferencas else '\n'.join( diferencas ) )
+
+    sys.exit( 1 if diferencas else 0 )
@@ -0,0 +1,105 @@
+# Libraries
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Valores no formato bruto do train.csv do Kaggle (com os espaços sobrando)
+CITIES = np.array( ['Metropolitian ', 'Urban ', 'Semi-Urban '], dtype=object )
+TRAFFIC = np.array( ['Low ', 'Medium ', 'High ', 'Jam '], dtype=object )
+WEATHER = np.array( ['conditions Sunny', 'conditions Stormy', 'conditions Sandstorms',
+                     'conditions Cloudy', 'conditions Fog', 'conditions Windy', 'conditions NaN'], dtype=object )
+ORDERS = np.array( ['Snack ', 'Meal ', 'Drinks ', 'Buffet '], dtype=object )
+VEHICLES = np.array( ['motorcycle ', 'scooter ', 'electric_scooter ', 'bicycle '], dtype=object )
+FESTIVAL = np.array( ['No ', 'Yes '], dtype=object )
+DATES = pd.date_range( '2022-02-11', '2022-04-06', freq='D' )
+
+
+def _with_nan( rng, valores, taxa ):
+    """ Troca uma fração das linhas pelo marcador de ausência do dataset ('NaN ') """
+    valores = valores.astype( object )
+    valores[rng.random( len( valores ) ) < taxa] = 'NaN '
+
+    return valores
+
+
+def _lookup( valores ):
+    """ Tabela de textos pré-formatados: cada linha aponta para o mesmo objeto str """
+    return np.array( list( valores ), dtype=object )
+
+
+def generate_raw( n_linhas, seed=42, n_entregadores=None ):
+    """ Esta função tem a responsabilidade de gerar dados sintéticos no formato do train.csv
+        Tipos de ações:
+        1. Sortear, com semente fixa, cada coluna nos mesmos formatos do arquivo do Kaggle
+        2. Incluir os valores sujos: 'NaN ', '(min) NN', datas '%d-%m-%Y' e espaços no final
+
+        Input: Número de linhas, semente e quantidade de entregadores distintos
+        Output: Dataframe bruto, igual ao retornado por pd.read_csv( 'train.csv' )
+    """
+    rng = np.random.default_rng( seed )
+    n_entregadores = n_entregadores or max( 100, n_linhas // 30 )
+
+    # entregadores: cada um tem cidade, idade, veículo e nota base fixos
+    ids_entregadores = _lookup( 'CITY{:04d}RES{:02d}DEL{:02d} '.format( i // 100, i % 100, i % 3 )
+                                for i in range( n_entregadores ) )
+    entregador = rng.integers( 0, n_entregadores, n_linhas )
+    cidade_entregador = rng.integers( 0, len( CITIES ), n_entregadores )
+    idade_entregador = rng.integers( 20, 40, n_entregadores )
+    nota_entregador = rng.uniform( 3.5, 5.0, n_entregadores )
+
+    # idade e avaliação ficam ausentes juntas, como no dataset original
+    sem_idade = rng.random( n_linhas ) < 0.04
+    idade = _lookup( str( i ) for i in range( 100 ) )[idade_entregador[entregador]]
+    idade[sem_idade] = 'NaN '
+    nota = np.clip( np.round( nota_entregador[entregador] + rng.normal( 0, 0.3, n_linhas ), 1 ), 1.0, 6.0 )
+    nota = _lookup( '{:.1f}'.format( i / 10 ) for i in range( 61 ) )[( nota * 10 ).astype( int )]
+    nota[sem_idade] = 'NaN '
+
+    restaurante_lat = rng.uniform( 9.0, 31.0, n_linhas ).round( 6 )
+    restaurante_lon = rng.uniform( 72.0, 88.0, n_linhas ).round( 6 )
+    entrega_lat = ( restaurante_lat + rng.uniform( -0.15, 0.15, n_linhas ) ).round( 6 )
+    entrega_lon = ( restaurante_lon + rng.uniform( -0.15, 0.15, n_linhas ) ).round( 6 )
+
+    datas = _lookup( DATES.strftime( '%d-%m-%Y' ) )[rng.integers( 0, len( DATES ), n_linhas )]
+    horas = _lookup( '{:02d}:{:02d}:00'.format( h, m ) for h in range( 24 ) for m in range( 0, 60, 5 ) )
+    pedido = rng.integers( 0, len( horas ) - 3, n_linhas )
+    hora_pedido = horas[pedido]
+    hora_pedido[rng.random( n_linhas ) < 0.04] = 'NaN '
+
+    transito = rng.integers( 0, len( TRAFFIC ), n_linhas )
+    festival = ( rng.random( n_linhas ) < 0.02 ).astype( int )
+    tempo = ( 15 + 5 * transito + 15 * festival + rng.integers( 0, 25, n_linhas ) ).clip( 10, 54 )
+
+    df = pd.DataFrame( {
+        'ID': _lookup( '0x{:x} '.format( i ) for i in rng.permutation( n_linhas ) + 0x1000 ),
+        'Delivery_person_ID': ids_entregadores[entregador],
+        'Delivery_person_Age': idade,
+        'Delivery_person_Ratings': nota,
+        'Restaurant_latitude': restaurante_lat,
+        'Restaurant_longitude': restaurante_lon,
+        'Delivery_location_latitude': entrega_lat,
+        'Delivery_location_longitude': entrega_lon,
+        'Order_Date': datas,
+        'Time_Orderd': hora_pedido,
+        'Time_Order_picked': horas[pedido + 2],
+        'Weatherconditions': WEATHER[rng.integers( 0, len( WEATHER ), n_linhas )],
+        'Road_traffic_density': _with_nan( rng, TRAFFIC[transito], 0.01 ),
+        'Vehicle_condition': rng.integers( 0, 4, n_linhas ),
+        'Type_of_order': ORDERS[rng.integers( 0, len( ORDERS ), n_linhas )],
+        'Type_of_vehicle': VEHICLES[rng.integers( 0, len( VEHICLES ), n_linhas )],
+        'multiple_deliveries': _with_nan( rng, _lookup( '0123' )[rng.integers( 0, 4, n_linhas )], 0.02 ),
+        'Festival': _with_nan( rng, FESTIVAL[festival], 0.005 ),
+        'City': _with_nan( rng, CITIES[cidade_entregador[entregador]], 0.03 ),
+        'Time_taken(min)': _lookup( '(min) {}'.format( i ) for i in range( 60 ) )[tempo],
+    } )
+
+    return df
+
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.synthetic 1000000 train.csv
+    n_linhas = int( sys.argv[1] ) if len( sys.argv ) > 1 else 45593
+    destino = sys.argv[2] if len( sys.argv ) > 2 else 'train.csv'
+    generate_raw( n_linhas ).to_csv( destino, index=False )
+    print( '{} linhas gravadas em {}'.format( n_linhas, destino ) )
@@ -1,110 +1,40 @@
 # Libraries
-from haversine import haversine
-import plotly.express as px
-import plotly.graph_objects as go
-
-# bibliotecas necessárias
-import folium
 import pandas as pd
 import streamlit as st
-from PIL import Image
 
-from streamlit_folium import folium_static
+from utils import rendering
+from utils.backend import filtered_aggregates, load_page_aggregates
+from utils.deliverers import PAGE_PLAN, deliverer_profiles, top_delivers
+from utils.paging import paged_dataframe
+from utils.plan import run_plan
+from utils.timing import finish_rerun, stage, start_rerun
 
 st.set_page_config( page_title='Visão Entregadores', page_icon='🚚', layout='wide')
+start_rerun( 'Visão Entregadores' )
 
 # =====================================================================================================
 # Funções
 #======================================================================================================
-def top_delivers( df1, top_asc):
-    """ Esta função tem a responsabilidade de filtrar a média do tempo dos top delivers, 10 mais rápido ou 10 mais lentos
-        Tipos de ações:
-        2. Filtra as colunas 'Delivery_person_ID', 'City', 'Time_taken(min)'
-        3. Agrupar por 'City' e 'Time_taken(min)'
-        4. Tirar a média
-        5. Concatenar os tipos de "City"
-        5. Trazer um dataframe em lista
-                      
-        Input: Dataframe
-        Output: Dataframe em lista         
+@st.cache_data( max_entries=64, show_spinner=False )
+def page_tables( _aggregates, version, date_slider, traffic_options ):
+    """ Filtra os agregados materializados e executa o plano da página sobre eles, sem ler as entregas,
+        em cache por estado dos filtros ('_aggregates' não entra no hash)
     """
-    df2 = ( df1.loc[:, ['Delivery_person_ID', 'City', 'Time_taken(min)']]
-               .groupby( ['City', 'Delivery_person_ID'] )
-               .mean()
-               .sort_values( ['City', 'Time_taken(min)'], ascending=top_asc ).reset_index() )
-
-    df_aux01 = df2.loc[df2['City'] == 'Metropolitian', :].head(10)
-    df_aux02 = df2.loc[df2['City'] == 'Urban', :].head(10)
-    df_aux03 = df2.loc[df2['City'] == 'Semi-Urban', :].head(10)
-
-    df3 = pd.concat( [df_aux01, df_aux02, df_aux03] ).reset_index( drop=True )
-
-    return df3
-
-
-def clean_code( df1 ):
-    """ Esta função tem a responsabilidade de limpar o dataframe
-        Tipos de limpeza:
-        1. Remoção dos dados NaN
-        2. Mudança do tipo da coluna de dados
-        3. Remoção dos espaços da variáveis de texto
-        4. Formatação da coluna de datas
-        5. Limpeza da coluna de tempo (remoção do texto da variável numérica)
-
-        Input: Dataframe
-        Output: Dataframe        
-    """
-    # 1. limpando linhas 'NaN' das colunas identificadas
-    linhas_selecionadas = (df1['Delivery_person_Age'] != 'NaN ') 
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    linhas_selecionadas = (df1['Road_traffic_density'] != 'NaN ') 
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    linhas_selecionadas = (df1['City'] != 'NaN ') 
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    linhas_selecionadas = (df1['Festival'] != 'NaN ') 
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    linhas_selecionadas = (df1['multiple_deliveries'] != 'NaN ')
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    # 2. convertando a colunas de texto para numero inteiro
-    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].astype( 'int64' )
-    df1['multiple_deliveries'] = df1['multiple_deliveries'].astype( 'int64' )
-    
-    # 3. convertando a coluna Ratings de texto para numero decimal ( float )
-    df1['Delivery_person_Ratings'] = df1['Delivery_person_Ratings'].astype( float )
-    
-    # 4. convertando a coluna order_date de texto para data
-    df1['Order_Date'] = pd.to_datetime( df1['Order_Date'], format='%d-%m-%Y' )    
-      
-    # 5. Removendo os espacos dentro de strings/texto/object
-    df1.loc[:, 'ID'] = df1.loc[:, 'ID'].str.strip()
-    df1.loc[:, 'Road_traffic_density'] = df1.loc[:, 'Road_traffic_density'].str.strip()
-    df1.loc[:, 'Type_of_order'] = df1.loc[:, 'Type_of_order'].str.strip()
-    df1.loc[:, 'Type_of_vehicle'] = df1.loc[:, 'Type_of_vehicle'].str.strip()
-    df1.loc[:, 'City'] = df1.loc[:, 'City'].str.strip()
-    df1.loc[:, 'Festival'] = df1.loc[:, 'Festival'].str.strip()
-    
-    # 6. Limpando a coluna de time taken
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].apply( lambda x: x.split( '(min) ')[1] )
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].astype( 'int64' )
+    agregados = filtered_aggregates( _aggregates, date_slider, traffic_options )
+    # 'deliverer_mix' cobre todo o histórico (sem filtros): fica fora do plano
+    mix = agregados.pop( 'deliverer_mix' )
+    tabelas = run_plan( None, PAGE_PLAN, aggregates=agregados )
+    tabelas['perfil'] = deliverer_profiles( agregados['deliverers'], mix )
 
-    return df1
+    return tabelas
 
 # ====================================Inicio da estrutura lógica do código==============================
     
 # ======================================
-# Import dataset
+# Import dataset (agregados materializados na ingestão, em cache compartilhado)
 # ======================================
-df = pd.read_csv( 'train.csv' )
-
-# ======================================
-#Limpando os dados
-# ======================================
-df1 = clean_code( df )
+with stage( 'load' ):
+    aggregates, version = load_page_aggregates()
 
 
 # =======================================
@@ -113,7 +43,7 @@ df1 = clean_code( df )
 st.title( 'Marketplace - Visão Entregadores' )
 
 #image_path = 'pngwing.com.png'
-image = Image.open( 'pngwing.com.png' )
+image = rendering.logo()
 st.sidebar.image( image, width=230 )
 
 st.sidebar.markdown( '# La Place Company' )
@@ -140,13 +70,9 @@ traffic_options = st.sidebar.multiselect(
 st.sidebar.markdown( """---""" )
 st.sidebar.markdown( '### Powered by Wagner Sobrinho and Comunidade DS' )
 
-# Filtro de data
-linhas_selecionadas = df1['Order_Date'] <  date_slider 
-df1 = df1.loc[linhas_selecionadas, :]
-
-# Filtro de transito
-linhas_selecionadas = df1['Road_traffic_density'].isin( traffic_options )
-df1 = df1.loc[linhas_selecionadas, :]
+# Filtros de data e de transito aplicados dentro do page_tables: num acerto do cache nada é filtrado
+with stage( 'aggregate.page_tables' ):
+    tabelas = page_tables( aggregates, version, date_slider, tuple( traffic_options ) )
 
 
 # =======================================
@@ -161,23 +87,23 @@ with tab1:
         col1, col2, col3, col4 = st.columns( 4, gap='large' )
         with col1:
             # A maior idade dos entregadores
-            maior_idade = df1.loc[:, 'Delivery_person_Age'].max()
+            maior_idade = tabelas['idade'].loc[0, 'maior_idade']
             col1.metric( 'Maior idade', maior_idade )
 
             
         with col2:
             # A menor idade dos entregadores
-            menor_idade = df1.loc[:, 'Delivery_person_Age'].min()
+            menor_idade = tabelas['idade'].loc[0, 'menor_idade']
             col2.metric( 'Menor idade', menor_idade )
             
         with col3:
             # A melhor condição do veículo
-            melhor_condicao = df1.loc[:, 'Vehicle_condition'].max()
+            melhor_condicao = tabelas['condicao'].loc[0, 'melhor_condicao']
             col3.metric( 'Melhor condição', melhor_condicao )
             
         with col4:
             # A pior condição do veículo
-            pior_condicao = df1.loc[:, 'Vehicle_condition'].min()
+            pior_condicao = tabelas['condicao'].loc[0, 'pior_condicao']
             col4.metric( 'Pior condição', pior_condicao )
             
     with st.container():
@@ -187,38 +113,24 @@ with tab1:
         col1, col2 = st.columns( 2 )
         with col1:
             st.markdown( '##### Avaliação Média por Entregador' )
-            df_avg_ratings_per_deliver = ( df1.loc[:, ['Delivery_person_Ratings', 'Delivery_person_ID']]
-                                              .groupby( 'Delivery_person_ID' )
-                                              .mean()
-                                              .reset_index() )
-            st.dataframe( df_avg_ratings_per_deliver )
+            # Perfil de cada entregador (avaliação, tempo, entregas, cidade, veículo e idade). Uma linha por
+            # entregador: cresce com a frota, então só a página visível vai ao navegador
+            df_perfil = tabelas['perfil']
+            with stage( 'render.avaliacao_entregador' ):
+                paged_dataframe( df_perfil, key='avaliacao_entregador' )
                 
         with col2:
             st.markdown( '##### Avaliação Média por trânsito' )
-            df_avg_std_rating_by_traffic = ( df1.loc[:, ['Delivery_person_Ratings', 'Road_traffic_density']]
-                                                .groupby( 'Road_traffic_density')
-                                                .agg( {'Delivery_person_Ratings': ['mean', 'std' ]} ) )
-
-            # mudanca de nome das colunas
-            df_avg_std_rating_by_traffic.columns = ['delivery_mean', 'delivery_std']
-
-            # reset do index
-            df_avg_std_rating_by_traffic = df_avg_std_rating_by_traffic.reset_index()
-            st.dataframe( df_avg_std_rating_by_traffic )
+            df_avg_std_rating_by_traffic = tabelas['avaliacao_transito']
+            with stage( 'render.avaliacao_transito' ):
+                st.dataframe( df_avg_std_rating_by_traffic )
             
             
             
             st.markdown( '##### Avaliação Média por clima' )
-            df_avg_std_rating_by_weather = ( df1.loc[:, ['Delivery_person_Ratings', 'Weatherconditions']]
-                                                .groupby( 'Weatherconditions')
-                                                .agg( {'Delivery_person_Ratings': ['mean', 'std']} ) )
-
-            # mudanca de nome das colunas
-            df_avg_std_rating_by_weather.columns = ['delivery_mean', 'delivery_std']
-
-            # reset do index
-            df_avg_std_rating_by_weather = df_avg_std_rating_by_weather.reset_index()
-            st.dataframe( df_avg_std_rating_by_weather )
+            df_avg_std_rating_by_weather = tabelas['avaliacao_clima']
+            with stage( 'render.avaliacao_clima' ):
+                st.dataframe( df_avg_std_rating_by_weather )
             
     
     with st.container():
@@ -226,16 +138,20 @@ with tab1:
         st.header( 'Velocidade de Entrega' )
         
         col1, col2 = st.columns( 2 )
+
+        df_rapidos, df_lentos = top_delivers( tabelas['tempo_entregador'] )
         
         with col1:
             st.markdown( '##### Top Entregadores mais rápidos' )
-            df3 = top_delivers ( df1, top_asc=True)
-            st.dataframe( df3 )
+            with stage( 'render.entregadores_rapidos' ):
+                st.dataframe( df_rapidos )
             
         with col2:
             st.markdown( '##### Top Entregadores mais lentos' )
-            df3 = top_delivers ( df1, top_asc=False)
-            st.dataframe( df3 )
+            with stage( 'render.entregadores_lentos' ):
+                st.dataframe( df_lentos )
+
+finish_rerun()
 
             
         
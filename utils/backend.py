@@ -0,0 +1,158 @@
+# Libraries
+import os
+
+from utils import polars_backend, sql_backend
+from utils.company import WEEKLY_COLUMNS, weekly_orders
+from utils.cube import drop_unused_categories
+from utils.data import DATA_PATH, load_aggregates, load_dataset
+from utils.filters import apply_filters
+from utils.plan import plan_columns, run_plan
+from utils.snapshot import current_snapshot
+from utils.timing import timed
+
+# Engines de consulta sobre o snapshot colunar. Cada engine é um módulo com as funções
+# ENGINE_FUNCTIONS, com os mesmos argumentos e resultados nos dois módulos; todas recebem o
+# snapshot aberto uma vez por rerun pelo load_page_data / load_page_aggregates.
+ENGINES = {'duckdb': sql_backend, 'polars': polars_backend}
+ENGINE_FUNCTIONS = ( 'stats_query', 'partials_query', 'aggregates_query', 'cube_query',
+                     'weekly_orders_query', 'rows_query' )
+
+# Backends das consultas das páginas
+BACKENDS = ( 'pandas', ) + tuple( ENGINES )
+
+# Backend usado pelas páginas (ex.: LAPLACE_BACKEND=polars streamlit run Home.py).
+# 'pandas' mantém as entregas limpas em memória; 'duckdb' (SQL) e 'polars' (consultas preguiçosas,
+# em várias threads) consultam o snapshot colunar com os filtros da barra lateral dentro da consulta
+# e só trazem para o pandas as tabelas já agregadas.
+BACKEND = os.environ.get( 'LAPLACE_BACKEND', 'pandas' )
+
+if BACKEND not in BACKENDS:
+    raise ValueError( 'LAPLACE_BACKEND desconhecido: {} (use {})'.format( BACKEND, BACKENDS ) )
+
+
+def load_page_data( path=DATA_PATH, backend=BACKEND ):
+    """ Esta função tem a responsabilidade de carregar o que as páginas consultam
+        Tipos de ações:
+        1. No pandas, carregar dados limpos, cubo e versão (load_dataset)
+        2. Nas engines (duckdb, polars), só fixar o snapshot aberto e devolvê-lo no lugar do dataframe
+           e do cubo: nada é carregado no pandas, e todas as consultas do rerun, que recebem esse
+           snapshot, leem a mesma versão mesmo se uma nova for publicada no meio do rerun
+
+        Input: Caminho do arquivo CSV e backend
+        Output: Tupla (dataframe limpo, cubo, versão dos dados); nas engines, dataframe e cubo são o snapshot
+    """
+    if backend in ENGINES:
+        snapshot = current_snapshot( path )
+        return snapshot, snapshot, snapshot['signature']
+
+    return load_dataset( path )
+
+
+def load_page_aggregates( path=DATA_PATH, backend=BACKEND ):
+    """ Agregados materializados e versão dos dados (nas engines, o snapshot fixado para o rerun:
+        os agregados são calculados por consulta)
+    """
+    if backend in ENGINES:
+        snapshot = current_snapshot( path )
+        return snapshot, snapshot['signature']
+
+    return load_aggregates( path )
+
+
+def filtered_cube( cube, date_slider, traffic_options, backend=BACKEND ):
+    """ Cubo de KPIs filtrado pela data limite e pelo trânsito (nas engines, 'cube' é o snapshot do rerun) """
+    if backend in ENGINES:
+        return ENGINES[backend].cube_query( date_slider, traffic_options, cube )
+
+    return apply_filters( cube, date_slider, list( traffic_options ) )
+
+
+def filtered_weekly_orders( df1, date_slider, traffic_options, backend=BACKEND ):
+    """ Pedidos e entregadores únicos por semana, com os filtros aplicados (nas engines, 'df1' é o snapshot do rerun) """
+    if backend in ENGINES:
+        return ENGINES[backend].weekly_orders_query( date_slider, traffic_options, df1 )
+
+    return weekly_orders( apply_filters( df1, date_slider, list( traffic_options ), WEEKLY_COLUMNS ) )
+
+
+def filtered_rows( df1, colunas, date_slider, traffic_options, backend=BACKEND ):
+    """ Entregas filtradas com as colunas pedidas (no pandas, sem filtro de trânsito, vem a fatia inteira, sem cópia) """
+    if backend in ENGINES:
+        return ENGINES[backend].rows_query( colunas, date_slider, traffic_options, df1 )
+
+    return apply_filters( df1, date_slider, list( traffic_options ), colunas )
+
+
+def filtered_aggregates( aggregates, date_slider, traffic_options, backend=BACKEND ):
+    """ Agregados materializados (perfil diário dos entregadores, ...) com os filtros aplicados; os que
+        não têm 'Order_Date' na chave cobrem todo o histórico e voltam sem filtro (nas engines,
+        'aggregates' é o snapshot do rerun)
+    """
+    if backend in ENGINES:
+        return ENGINES[backend].aggregates_query( date_slider, traffic_options, aggregates )
+
+    return {nome: apply_filters( df_aux, date_slider, list( traffic_options ) ) if 'Order_Date' in df_aux else df_aux
+            for nome, df_aux in aggregates.items()}
+
+
+def plan_queries( plan ):
+    """ Esta função tem a responsabilidade de montar as consultas de um plano para as engines
+        Tipos de ações:
+        1. Juntar as estatísticas com as mesmas chaves numa única consulta
+        2. Dar a cada estatística um apelido 's<i>_<j>' (estatística j do i-ésimo nome da consulta)
+
+        Input: Plano da página
+        Output: Dicionário tupla de chaves -> ( nomes do plano, [( apelido, estatística, coluna )] )
+    """
+    grupos = {}
+    for nome, spec in plan.items():
+        grupos.setdefault( tuple( spec['by'] ), [] ).append( nome )
+
+    return {by: ( nomes, [( 's{}_{}'.format( i, j ), stat, plan[nome]['col'] )
+                          for i, nome in enumerate( nomes ) for j, stat in enumerate( plan[nome]['stats'].values() )] )
+            for by, nomes in grupos.items()}
+
+
+@timed( 'aggregate' )
+def run_plan_query( engine, plan, date_slider, traffic_options, snapshot ):
+    """ Esta função tem a responsabilidade de calcular o plano de uma página numa engine
+        Tipos de ações:
+        1. Montar as consultas do plano (plan_queries) e executá-las na engine (stats_query)
+        2. Separar as estatísticas de cada nome nas mesmas tabelas do run_plan (colunas de 'by' +
+           colunas de 'stats', ordenadas pelas chaves)
+
+        Input: Módulo da engine, plano da página, data limite, opções de trânsito e snapshot aberto
+        Output: Dicionário nome -> dataframe
+    """
+    consultas = plan_queries( plan )
+    tabelas = engine.stats_query( [( list( by ), estatisticas ) for by, ( _, estatisticas ) in consultas.items()],
+                                  date_slider, traffic_options, snapshot )
+
+    resultado = {}
+    for ( by, ( nomes, _ ) ), df_aux in zip( consultas.items(), tabelas ):
+        for i, nome in enumerate( nomes ):
+            df_final = df_aux.loc[:, list( by )].copy()
+            for j, saida in enumerate( plan[nome]['stats'] ):
+                df_final[saida] = df_aux['s{}_{}'.format( i, j )]
+            resultado[nome] = drop_unused_categories( df_final, list( by ) )
+
+    return resultado
+
+
+def filtered_plan( df1, cube, plan, date_slider, traffic_options, backend=BACKEND ):
+    """ Esta função tem a responsabilidade de calcular o plano de uma página com os filtros aplicados
+        Tipos de ações:
+        1. No pandas, filtrar entregas e cubo e executar o run_plan
+        2. Nas engines, executar o plano na consulta (run_plan_query) sobre o snapshot do rerun ('df1'),
+           com os filtros dentro dela
+
+        Input: Dataframe limpo, cubo (ou None), plano, data limite, opções de trânsito e backend
+        Output: Dicionário nome -> dataframe, igual em todos os backends
+    """
+    if backend in ENGINES:
+        return run_plan_query( ENGINES[backend], plan, date_slider, traffic_options, df1 )
+
+    df_aux = apply_filters( df1, date_slider, list( traffic_options ), plan_columns( plan ) )
+    cube_aux = apply_filters( cube, date_slider, list( traffic_options ) ) if cube is not None else None
+
+    return run_plan( df_aux, plan, cube=cube_aux )
@@ -0,0 +1,167 @@
+# Libraries
+import numpy as np
+import pandas as pd
+
+from utils.timing import stage
+
+# Colunas em que o dataset marca dado ausente com o texto 'NaN '
+NAN_COLUMNS = ['Delivery_person_Age', 'Road_traffic_density', 'City', 'Festival', 'multiple_deliveries']
+
+# Colunas de texto com poucos valores distintos, guardadas como categóricas
+CATEGORY_COLUMNS = ['Road_traffic_density', 'Type_of_order', 'Type_of_vehicle', 'City', 'Festival', 'Weatherconditions',
+                    'Delivery_person_ID', 'Time_Orderd', 'Time_Order_picked']
+
+# Colunas de texto com espaços sobrando no final
+STRIP_COLUMNS = ['Road_traffic_density', 'Type_of_order', 'Type_of_vehicle', 'City', 'Festival']
+
+# Esquema compacto das colunas numéricas depois da limpeza. 'integer' é o menor inteiro que comporta
+# os valores (int8, int16, ...), decidido pelos dados. O float32 guarda ~7 dígitos significativos:
+# menos de 1 m de erro nas coordenadas e nenhuma diferença visível em notas e distâncias.
+COMPACT_SCHEMA = {'Delivery_person_Age': 'integer', 'multiple_deliveries': 'integer', 'Vehicle_condition': 'integer',
+                  'Time_taken(min)': 'integer', 'Delivery_person_Ratings': 'float32',
+                  'Restaurant_latitude': 'float32', 'Restaurant_longitude': 'float32',
+                  'Delivery_location_latitude': 'float32', 'Delivery_location_longitude': 'float32',
+                  'distance': 'float32'}
+
+# Raio médio da Terra em km (o mesmo usado pela biblioteca haversine)
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_np( lat1, lon1, lat2, lon2 ):
+    """ Esta função tem a responsabilidade de calcular a distância entre dois pontos
+        Tipos de ações:
+        1. Converter as coordenadas de graus para radianos
+        2. Aplicar a fórmula de haversine sobre os arrays inteiros (sem loop em Python)
+
+        Input: Arrays de latitude e longitude de origem e de destino (em graus)
+        Output: Array com as distâncias em km
+    """
+    lat1, lon1, lat2, lon2 = ( np.radians( np.asarray( x, dtype='float64' ) ) for x in ( lat1, lon1, lat2, lon2 ) )
+    a = np.sin( ( lat2 - lat1 ) * 0.5 ) ** 2 + np.cos( lat1 ) * np.cos( lat2 ) * np.sin( ( lon2 - lon1 ) * 0.5 ) ** 2
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin( np.sqrt( a ) )
+
+
+def _convert_unique( serie, conversor ):
+    """ Converte apenas os valores distintos da coluna e espalha o resultado pelas
+        linhas através dos códigos do factorize. Datas, idades e tempos têm poucas
+        dezenas de valores distintos, então o custo fica proporcional a eles e não
+        ao número de linhas.
+    """
+    codes, uniques = pd.factorize( serie )
+    valores = np.asarray( conversor( pd.Series( uniques, dtype=object ) ) )
+
+    return pd.Series( pd.api.extensions.take( valores, codes, allow_fill=True ), index=serie.index )
+
+
+def _to_category( serie, strip ):
+    """ Transforma a coluna de texto em categórica, removendo os espaços só das
+        categorias. As categorias ficam em ordem alfabética para os group-bys
+        manterem a mesma ordem das colunas de texto.
+    """
+    codes, uniques = pd.factorize( serie )
+    nomes = pd.Index( uniques, dtype=object )
+    if strip:
+        nomes = nomes.str.strip()
+
+    categorias = nomes.unique().sort_values()
+    # o -1 extra no final preserva os valores ausentes (código -1 do factorize)
+    posicoes = np.append( categorias.get_indexer( nomes ), -1 )
+
+    return pd.Series( pd.Categorical.from_codes( posicoes[codes], categories=categorias ), index=serie.index )
+
+
+def drop_nan_rows( df1 ):
+    """ 1. Remove, numa única passada, as linhas com 'NaN ' em qualquer coluna de NAN_COLUMNS """
+    linhas_selecionadas = np.ones( len( df1 ), dtype=bool )
+    for col in NAN_COLUMNS:
+        linhas_selecionadas &= ( df1[col] != 'NaN ' ).to_numpy()
+
+    return df1.loc[linhas_selecionadas, :].copy()
+
+
+def convert_numbers( df1 ):
+    """ 2. e 3. Converte idade e entregas múltiplas para inteiro e avaliação para decimal """
+    df1['Delivery_person_Age'] = _convert_unique( df1['Delivery_person_Age'], lambda x: x.astype( 'int64' ) )
+    df1['multiple_deliveries'] = _convert_unique( df1['multiple_deliveries'], lambda x: x.astype( 'int64' ) )
+    df1['Delivery_person_Ratings'] = _convert_unique( df1['Delivery_person_Ratings'], lambda x: x.astype( float ) )
+
+    return df1
+
+
+def convert_dates( df1 ):
+    """ 4. Converte a coluna Order_Date de texto para data """
+    df1['Order_Date'] = _convert_unique( df1['Order_Date'],
+                                         lambda x: pd.to_datetime( x, format='%d-%m-%Y' ) ).astype( 'datetime64[ns]' )
+
+    return df1
+
+
+def convert_texts( df1 ):
+    """ 5. Remove os espaços das colunas de texto e converte as de baixa cardinalidade para categórica """
+    df1['ID'] = df1['ID'].str.strip()
+    for col in CATEGORY_COLUMNS:
+        df1[col] = _to_category( df1[col], strip=col in STRIP_COLUMNS )
+
+    return df1
+
+
+def convert_time_taken( df1 ):
+    """ 6. Limpa a coluna de tempo, removendo o prefixo '(min) ' """
+    df1['Time_taken(min)'] = _convert_unique( df1['Time_taken(min)'],
+                                              lambda x: x.str.replace( '(min) ', '', regex=False ).astype( 'int64' ) )
+
+    return df1
+
+
+def add_distance( df1 ):
+    """ 7. Calcula uma única vez a distância (km) entre o restaurante e o local de entrega
+        (com as coordenadas ainda em float64, antes do esquema compacto)
+    """
+    df1['distance'] = haversine_np( df1['Restaurant_latitude'], df1['Restaurant_longitude'],
+                                    df1['Delivery_location_latitude'], df1['Delivery_location_longitude'] )
+
+    return df1
+
+
+def compact_numbers( df1 ):
+    """ 8. Aplica o COMPACT_SCHEMA: inteiros no menor tipo possível e decimais em float32 """
+    for col, tipo in COMPACT_SCHEMA.items():
+        if tipo == 'integer':
+            df1[col] = pd.to_numeric( df1[col], downcast='integer' )
+        else:
+            df1[col] = df1[col].astype( tipo )
+
+    return df1
+
+
+def sort_by_date( df1 ):
+    """ 9. Ordena as linhas por 'Order_Date' (ordenação estável), para o filtro de data virar busca binária """
+    return df1.sort_values( 'Order_Date', kind='mergesort' ).reset_index( drop=True )
+
+
+# Etapas do clean_code, na ordem em que são aplicadas (usadas também no benchmark)
+CLEAN_STEPS = [drop_nan_rows, convert_numbers, convert_dates, convert_texts, convert_time_taken, add_distance,
+               compact_numbers, sort_by_date]
+
+
+def clean_code( df1 ):
+    """ Esta função tem a responsabilidade de limpar o dataframe
+        Tipos de limpeza:
+        1. Remoção dos dados NaN (uma única máscara e uma única cópia)
+        2. Mudança do tipo da coluna de dados
+        3. Remoção dos espaços da variáveis de texto e conversão para categórica
+        4. Formatação da coluna de datas
+        5. Limpeza da coluna de tempo (remoção do texto da variável numérica)
+        6. Cálculo da coluna 'distance' (km) entre restaurante e local de entrega
+        7. Esquema compacto (inteiros pequenos e float32)
+        8. Ordenação das linhas por data
+
+        Input: Dataframe
+        Output: Dataframe
+    """
+    for step in CLEAN_STEPS:
+        with stage( 'clean.' + step.__name__ ):
+            df1 = step( df1 )
+
+    return df1
@@ -0,0 +1,183 @@
+# Libraries
+import pandas as pd
+
+from utils import rendering
+from utils.cube import rollup
+from utils.timing import timed
+
+# Limite de pontos de entrega enviados ao mapa (acima disso é usada uma amostra)
+MAX_MAP_POINTS = 200_000
+
+# Colunas usadas pelo mapa
+MAP_COLUMNS = ['City', 'Road_traffic_density', 'Delivery_location_latitude', 'Delivery_location_longitude']
+
+# Colunas usadas pelo resumo semanal (weekly_orders)
+WEEKLY_COLUMNS = ['Order_Date', 'ID', 'Delivery_person_ID']
+
+
+@timed( 'figure' )
+def country_maps ( df1, pontos=False ):
+    """ Esta função tem a responsabilidade de montar um mapa
+        Tipos de ações:
+        1. Filtra as colunas 'City', 'Road_traffic_density', 'Delivery_location_latitude' e 'Delivery_location_longitude'
+        2. Agrupar por 'City' e 'Road_traffic_density'
+        3. Tirar a mediana
+        4. Criar um mapa c/ todos os marcadores numa única camada
+        5. Opcional: incluir os pontos de entrega em uma camada agrupada (cluster) no navegador
+        
+        Input: Dataframe e se os pontos de entrega devem ser incluídos
+        Output: Mapa com as localizações de entrega         
+    """
+    df_mapa = ( df1[MAP_COLUMNS].groupby(['City', 'Road_traffic_density'], observed=True)
+                                .median()
+                                .reset_index() )
+    # Desenhar o mapa
+    folium = rendering.folium()
+    map = folium.Map( zoom_start=11 )
+
+    # Medianas por cidade e tipo de tráfego, numa única camada
+    medianas = folium.FeatureGroup( name='Medianas por cidade e tráfego' )
+    for city, traffic, lat, lon in zip( df_mapa['City'], df_mapa['Road_traffic_density'],
+                                        df_mapa['Delivery_location_latitude'], df_mapa['Delivery_location_longitude'] ):
+        folium.Marker( [float( lat ), float( lon )], popup='{} - {}'.format( city, traffic ) ).add_to( medianas )
+    medianas.add_to( map )
+
+    # Pontos de entrega: o agrupamento é feito no navegador, só as coordenadas vão no HTML
+    coordenadas = df1[['Delivery_location_latitude', 'Delivery_location_longitude']]
+    if pontos and len( coordenadas ) > 0:
+        if len( coordenadas ) > MAX_MAP_POINTS:
+            coordenadas = coordenadas.sample( MAX_MAP_POINTS, random_state=0 )
+        FastMarkerCluster = rendering.fast_marker_cluster()
+        FastMarkerCluster( coordenadas.to_numpy( dtype='float64' ).round( 6 ).tolist(), name='Entregas' ).add_to( map )
+        folium.LayerControl().add_to( map )
+
+    if len( df_mapa ) > 0:
+        limites = df_mapa[['Delivery_location_latitude', 'Delivery_location_longitude']]
+        map.fit_bounds( [limites.min().tolist(), limites.max().tolist()] )
+
+    return map
+
+
+def week_of_year( df1 ):
+    """ Semana do ano de cada pedido ('%U', domingo como início), sem alterar o dataframe """
+    return df1['Order_Date'].dt.strftime( '%U' ).rename( 'week_of_year' )
+
+
+@timed( 'aggregate' )
+def weekly_orders( df1 ):
+    """ Esta função tem a responsabilidade de resumir os pedidos por semana
+        Tipos de ações:
+        1. Calcular a semana 'week_of_year' de cada pedido
+        2. Contar os pedidos ('ID') e os entregadores únicos ('Delivery_person_ID') por semana
+
+        Input: Dataframe (filtrado)
+        Output: Dataframe com 'week_of_year', 'ID' e 'Delivery_person_ID', uma linha por semana
+    """
+    semana = week_of_year( df1 )
+    df_aux = pd.DataFrame( {'ID': df1['ID'].groupby( semana ).count(),
+                            'Delivery_person_ID': df1['Delivery_person_ID'].groupby( semana ).nunique()} )
+
+    return df_aux.reset_index()
+
+
+@timed( 'figure' )
+def order_share_by_week( df_semana ):
+    """ Esta função tem a responsabilidade de plotar um gráfico de linha
+        Tipos de ações:
+        1. Dividir as entregas por semana pelos entregadores únicos por semana
+        2. Desenhar e plotar um gráfico de linhas
+                      
+        Input: Pedidos por semana (weekly_orders)
+        Output: Gráfico de linhas         
+    """    
+    df_aux = df_semana.loc[:, ['week_of_year']].copy()
+    # Divisão da entregas por semana pelo entregadores unicos por semana
+    df_aux['order_by_delivery'] = df_semana['ID'] / df_semana['Delivery_person_ID']
+            
+    # Desenhar gráfico de linha
+    px = rendering.plotly_express()
+    fig = px.line( df_aux, x='week_of_year', y='order_by_delivery' )
+
+    return fig
+
+
+@timed( 'figure' )
+def order_by_week( df_semana ):
+    """ Esta função tem a responsabilidade de plotar um gráfico de linha
+        Tipos de ações:
+        1. Quantidade de pedidos por semana
+        2. Desenhar e plotar um gráfico de linhas
+                      
+        Input: Pedidos por semana (weekly_orders)
+        Output: Gráfico de linhas         
+    """
+    # Desenhar gráfico de linha
+    px = rendering.plotly_express()
+    fig = px.line( df_semana, x='week_of_year', y='ID' )
+
+    return fig
+
+
+@timed( 'figure' )
+def traffic_order_city( cube ):
+    """ Esta função tem a responsabilidade de plotar um gráfico de scatter
+        Tipos de ações:
+        1. Cubo - Comparar volume de pedidos por cidade e tipo de trafego
+        2. Consolidar o cubo por 'City' e 'Road_traffic_density'
+        3. Somar as contagens
+        4. Desenhar e plotar um gráfico de scatter
+                      
+        Input: Cubo de KPIs (filtrado)
+        Output: Gráfico de scatter         
+    """
+    # Comparação do volume de pedidos por cidade e tipo de tráfego
+    df_aux = rollup( cube, ['City', 'Road_traffic_density'] ).rename( columns={'count': 'ID'} )
+    # Desenhar gráfico scatter
+    px = rendering.plotly_express()
+    fig = px.scatter(df_aux, x='City', y='Road_traffic_density', size='ID', color='City')
+    
+    return fig        
+
+
+@timed( 'figure' )
+def traffic_order_density( cube ):
+    """ Esta função tem a responsabilidade de plotar um gráfico de pizza
+        Tipos de ações:
+        1. Cubo - Distribuição dos pedidos por tipo de tráfego
+        2. Consolidar o cubo por 'Road_traffic_density'
+        3. Somar as contagens
+        4. Transfornmar em percentual
+        5. Desenhar e plotar um gráfico de pizza
+                      
+        Input: Cubo de KPIs (filtrado)
+        Output: Gráfico de pizza         
+    """
+    # Distribuição dos pedidos por tipo de tráfego
+    df_aux = rollup( cube, ['Road_traffic_density'] ).rename( columns={'count': 'ID'} )
+    df_aux['entregas_perc'] = df_aux['ID'] / df_aux['ID'].sum()       
+    # Desenhar gráfico de pizza
+    px = rendering.plotly_express()
+    fig = px.pie(df_aux, values='entregas_perc', names='Road_traffic_density')
+    
+    return fig
+    
+
+@timed( 'figure' )
+def order_metric( cube ):
+    """ Esta função tem a responsabilidade de plotar um gráfico de barras
+        Tipos de ações:
+        1. Cubo - Quantidade de entregas por dia
+        2. Consolidar o cubo por 'Order_Date'
+        3. Somar as contagens
+        4. Desenhar e plotar um gráfico de barras
+                      
+        Input: Cubo de KPIs (filtrado)
+        Output: Gráfico de barras         
+    """
+    # Seleção de linhas
+    df_aux = rollup( cube, ['Order_Date'] ).rename( columns={'count': 'ID'} )
+    # Desenhar gráfico de barras
+    px = rendering.plotly_express()
+    fig = px.bar( df_aux, x='Order_Date', y='ID' )
+
+    return fig
@@ -0,0 +1,62 @@
+# Libraries
+import numpy as np
+import pandas as pd
+
+# Granularidade do cubo: todas as dimensões usadas pelos filtros e gráficos das páginas
+CUBE_DIMENSIONS = ['Order_Date', 'City', 'Road_traffic_density', 'Festival', 'Type_of_order', 'Weatherconditions']
+
+# Medidas aditivas: com contagem, soma e soma dos quadrados dá para reconstruir média e desvio padrão
+CUBE_MEASURES = ['count', 'time_sum', 'time_sumsq']
+
+
+def drop_unused_categories( df_aux, colunas ):
+    """ Remove das colunas-chave categóricas de um resultado agregado as categorias sem linhas.
+        O plotly agrupa com observed=False e quebra (KeyError) numa categoria vazia, como
+        quando o filtro de data ou de trânsito não deixa nenhuma entrega numa cidade.
+    """
+    for col in colunas:
+        if isinstance( df_aux[col].dtype, pd.CategoricalDtype ):
+            df_aux[col] = df_aux[col].cat.remove_unused_categories()
+
+    return df_aux
+
+
+def build_cube( df1 ):
+    """ Esta função tem a responsabilidade de pré-agregar as entregas
+        Tipos de ações:
+        1. Calcular o quadrado do tempo de entrega
+        2. Agrupar por dia, cidade, trânsito, festival, tipo de pedido e clima
+        3. Somar contagem, tempo e tempo ao quadrado
+
+        Input: Dataframe limpo
+        Output: Dataframe do cubo (algumas milhares de linhas, independente do volume de entregas),
+                ordenado por 'Order_Date' como o dataframe de entregas
+    """
+    tempo = df1['Time_taken(min)'].astype( 'float64' )
+    df_aux = df1.loc[:, CUBE_DIMENSIONS].assign( count=1, time_sum=tempo, time_sumsq=tempo * tempo )
+    cube = df_aux.groupby( CUBE_DIMENSIONS, observed=True ).sum().sort_index().reset_index()
+    cube['count'] = cube['count'].astype( 'int64' )
+
+    return cube
+
+
+def rollup( cube, by ):
+    """ Esta função tem a responsabilidade de consolidar o cubo em um nível mais agregado
+        Tipos de ações:
+        1. Agrupar o cubo pelas dimensões pedidas
+        2. Somar as medidas
+        3. Reconstruir média e desvio padrão amostral do tempo de entrega
+
+        Input: Cubo (filtrado) e lista de dimensões
+        Output: Dataframe com as dimensões, 'count', 'avg_time' e 'std_time'
+    """
+    # sort_index garante a ordem das categorias (com observed=True o pandas mantém a ordem de aparição)
+    df_aux = cube.loc[:, by + CUBE_MEASURES].groupby( by, observed=True ).sum().sort_index().reset_index()
+
+    n = df_aux['count'].astype( 'float64' )
+    df_aux['avg_time'] = df_aux['time_sum'] / n
+    # variância amostral (ddof=1), como o .std() do pandas; com 1 entrega o desvio fica NaN
+    variancia = ( df_aux['time_sumsq'] - df_aux['time_sum'] * df_aux['avg_time'] ) / ( n - 1 ).where( n > 1 )
+    df_aux['std_time'] = np.sqrt( variancia.clip( lower=0 ) )
+
+    return drop_unused_categories( df_aux.drop( columns=['time_sum', 'time_sumsq'] ), by )
@@ -0,0 +1,245 @@
+# Libraries
+import os
+import threading
+
+import pandas as pd
+import streamlit as st
+
+from utils.cleaning import clean_code
+from utils.cube import build_cube
+from utils.incremental import concat_clean, merge_cube
+from utils.memory import memory_report, read_only
+from utils.refresh import REFRESH_INTERVAL, start_refresh_worker
+from utils.snapshot import build_snapshot, read_aggregates, read_snapshot, snapshot_path, source_signature
+from utils.snapshot import write_aggregates
+from utils.streaming import build_aggregates, merge_aggregates
+from utils.timing import stage
+
+# Arquivo de origem dos dados
+DATA_PATH = 'train.csv'
+
+# Pasta onde novos lotes de entregas (CSV no formato do train.csv) são depositados.
+# Grave o lote com outro nome/extensão e renomeie para .csv no final, para ele nunca ser lido pela metade.
+BATCH_DIR = 'batches'
+
+
+# Estado compartilhado por todas as páginas e sessões do processo (um por arquivo de origem).
+# Fica no módulo, que o Python importa uma única vez, e funciona também fora do Streamlit.
+_STATES = {}
+_STATES_LOCK = threading.Lock()
+
+
+def _dataset_state( path ):
+    """ Retorna o estado do arquivo: a versão atual dos dados ('current') e o lock da ingestão.
+
+        A versão atual é um dicionário que nunca é alterado depois de publicado: dados limpos, cubo,
+        agregados materializados (perfil diário dos entregadores, ...), versão do arquivo de origem,
+        lotes já incorporados e um contador que muda a cada alteração dos dados. A ingestão monta um
+        dicionário novo e troca a referência de uma vez; quem já leu a versão anterior continua com ela.
+    """
+    with _STATES_LOCK:
+        if path not in _STATES:
+            _STATES[path] = {'current': None, 'lock': threading.Lock()}
+
+        return _STATES[path]
+
+
+def _signature( path ):
+    source = path if os.path.exists( path ) else snapshot_path( path )
+
+    return source_signature( source )
+
+
+def pending_batches( batch_dir, processados ):
+    """ Esta função tem a responsabilidade de listar os lotes ainda não incorporados
+        Tipos de ações:
+        1. Listar os arquivos .csv da pasta de lotes
+        2. Descartar os que já foram processados
+
+        Os lotes são tratados como imutáveis: cada nome de arquivo é incorporado uma única vez.
+
+        Input: Pasta de lotes e conjunto de nomes já processados
+        Output: Lista de caminhos, em ordem alfabética
+    """
+    if not os.path.isdir( batch_dir ):
+        return []
+
+    nomes = sorted( entry.name for entry in os.scandir( batch_dir )
+                    if entry.is_file() and entry.name.endswith( '.csv' ) and entry.name not in processados )
+
+    return [os.path.join( batch_dir, nome ) for nome in nomes]
+
+
+def _load_source( path, signature, versao ):
+    """ Esta função tem a responsabilidade de montar a versão nova dos dados a partir do arquivo de origem
+        Tipos de ações:
+        1. Ler o snapshot (ou limpar o CSV e gravar o snapshot)
+        2. Ler o cubo e os agregados gravados ao lado dele (train.<nome>.feather, gravados na carga
+           anterior ou pela ingestão em streaming: python -m utils.streaming)
+        3. Se estiverem faltando ou desatualizados, calcular a partir dos dados limpos e gravar
+
+        Input: Caminho do arquivo CSV, versão do arquivo de origem e contador de versões
+        Output: Versão dos dados (dicionário do estado compartilhado)
+    """
+    with stage( 'load.read_snapshot' ):
+        df1 = read_snapshot( path )
+    if df1 is None:
+        df1 = build_snapshot( path )
+        # reaberto do snapshot recém-gravado: os dados ficam nos buffers do memory-map, não no heap
+        with stage( 'load.read_snapshot' ):
+            relido = read_snapshot( path )
+        df1 = relido if relido is not None else df1
+
+    with stage( 'load.read_aggregates' ):
+        aggregates = read_aggregates( path )
+    if aggregates is None:
+        with stage( 'load.build_cube' ):
+            cube = build_cube( df1 )
+        with stage( 'load.build_aggregates' ):
+            aggregates = build_aggregates( df1 )
+        if os.path.exists( path ):
+            write_aggregates( {'cube': cube, **aggregates}, path )
+    else:
+        cube = aggregates.pop( 'cube' )
+
+    return {'signature': signature, 'df1': read_only( df1 ), 'cube': read_only( cube ),
+            'aggregates': {nome: read_only( df_aux ) for nome, df_aux in aggregates.items()},
+            'batches': frozenset(), 'version': versao}
+
+
+
+def _ingest( path, batch_dir, spinner=False ):
+    """ Esta função tem a responsabilidade de montar e publicar a próxima versão dos dados
+        Tipos de ações:
+        1. Recarregar tudo se o arquivo de origem mudou
+        2. Incorporar, de forma incremental, os lotes novos da pasta de lotes
+        3. Trocar a versão atual do estado pela nova numa única atribuição (troca atômica)
+
+        Roda na thread de atualização (utils.refresh) ou, na primeira carga, no próprio rerun.
+        Os reruns em andamento continuam com a versão que já leram.
+
+        Input: Caminho do arquivo CSV, pasta de lotes e se deve mostrar o aviso de carregamento
+        Output: Versão atual dos dados
+    """
+    state = _dataset_state( path )
+    with state['lock']:
+        atual = novo = state['current']
+        signature = _signature( path )
+        if atual is None or atual['signature'] != signature:
+            versao = atual['version'] + 1 if atual is not None else 1
+            if spinner:
+                with st.spinner( 'Carregando os dados...' ):
+                    novo = _load_source( path, signature, versao )
+            else:
+                novo = _load_source( path, signature, versao )
+
+        for batch in pending_batches( batch_dir, novo['batches'] ):
+            with stage( 'load.append_batch' ):
+                novo = _append_clean( novo, clean_code( pd.read_csv( batch ) ), os.path.basename( batch ) )
+
+        if novo is not atual:
+            state['current'] = novo
+
+        return novo
+
+
+def _refresh( path, batch_dir ):
+    """ Versão atual dos dados para o rerun. Só a primeira carga (ou REFRESH_INTERVAL = 0) acontece
+        no rerun; depois, a fonte e os lotes são verificados pela thread de atualização e o rerun
+        nunca espera pela ingestão.
+    """
+    atual = _dataset_state( path )['current']
+    if atual is None or REFRESH_INTERVAL <= 0:
+        return _ingest( path, batch_dir, spinner=True )
+
+    start_refresh_worker( 'data:{}'.format( path ), _ingest, path, batch_dir )
+
+    return atual
+
+
+def _append_clean( atual, df_novo, batch=None ):
+    """ Nova versão com um lote já limpo somado aos dados, ao cubo e aos agregados (a atual não muda) """
+    novo = dict( atual )
+    novo['df1'] = read_only( concat_clean( atual['df1'], df_novo ) )
+    novo['cube'] = read_only( merge_cube( atual['cube'], build_cube( df_novo ) ) )
+    novo['aggregates'] = {nome: read_only( df_aux )
+                          for nome, df_aux in merge_aggregates( atual['aggregates'], build_aggregates( df_novo ) ).items()}
+    novo['version'] = atual['version'] + 1
+    if batch is not None:
+        novo['batches'] = atual['batches'] | {batch}
+
+    return novo
+
+
+def append_rows( df_raw, path=DATA_PATH ):
+    """ Esta função tem a responsabilidade de incorporar novas entregas já lidas em memória
+        Tipos de ações:
+        1. Limpar somente as linhas novas
+        2. Juntar as linhas aos dados, ao cubo e aos agregados compartilhados e publicar a nova versão
+
+        Input: Dataframe bruto (formato do train.csv) e caminho do arquivo de origem
+        Output: None
+    """
+    _refresh( path, BATCH_DIR )
+    df_novo = clean_code( df_raw )
+    state = _dataset_state( path )
+    with state['lock']:
+        state['current'] = _append_clean( state['current'], df_novo )
+
+    return None
+
+
+def load_dataset( path=DATA_PATH ):
+    """ Esta função tem a responsabilidade de carregar, de forma consistente, tudo o que as páginas usam
+        Tipos de ações:
+        1. Pegar a versão atual do estado compartilhado
+        2. Devolver dados limpos, cubo e versão da mesma versão: como ela nunca é alterada, os três
+           correspondem aos mesmos dados mesmo se uma versão nova for publicada no meio do rerun
+        3. Sem copiar os dados: todas as sessões leem os mesmos buffers somente leitura (do memory-map
+           do snapshot, quando os dados vêm dele); cada chamada recebe só uma cópia rasa dos dataframes
+
+        Input: Caminho do arquivo CSV
+        Output: Tupla (dataframe limpo, cubo, versão dos dados)
+    """
+    atual = _refresh( path, BATCH_DIR )
+
+    return atual['df1'].copy( deep=False ), atual['cube'].copy( deep=False ), atual['version']
+
+
+def load_aggregates( path=DATA_PATH ):
+    """ Esta função tem a responsabilidade de carregar os agregados materializados
+        Tipos de ações:
+        1. Pegar a versão atual do estado compartilhado
+        2. Retornar os agregados de STREAM_AGGREGATES ('deliverers': perfil diário de
+           cada entregador; 'deliverer_mix': entregas por entregador, cidade e veículo;
+           'ratings': avaliações por dia, trânsito e clima) e a versão dos dados
+
+        As tabelas são mantidas de forma incremental (só os parciais de cada lote são somados) e são
+        compartilhadas e somente leitura.
+
+        Input: Caminho do arquivo CSV
+        Output: Tupla (dicionário nome -> dataframe de parciais, versão dos dados)
+    """
+    atual = _refresh( path, BATCH_DIR )
+
+    return dict( atual['aggregates'] ), atual['version']
+
+
+def dataset_memory_report( path=DATA_PATH ):
+    """ Esta função tem a responsabilidade de mostrar quanto os dados ocupam em memória
+        Tipos de ações:
+        1. Carregar (ou reaproveitar) o estado compartilhado
+        2. Medir os bytes por coluna, antes e depois do esquema compacto
+
+        Input: Caminho do arquivo CSV
+        Output: Dataframe do relatório de memória
+    """
+    return memory_report( _refresh( path, BATCH_DIR )['df1'] )
+
+
+if __name__ == '__main__':
+    # Uso: python -m utils.data [train.csv]
+    import sys
+
+    relatorio = dataset_memory_report( sys.argv[1] if len( sys.argv ) > 1 else DATA_PATH )
+    print( relatorio.to_string() )
@@ -0,0 +1,80 @@
+# Libraries
+from utils.plan import run_plan
+from utils.rankings import top_k_per_group
+from utils.timing import timed
+
+# Ordem das cidades nas tabelas de entregadores mais rápidos e mais lentos
+CITY_ORDER = ['Metropolitian', 'Urban', 'Semi-Urban']
+
+# Estatísticas do perfil de cada entregador, consolidadas a partir do perfil diário materializado
+PROFILE_PLAN = {
+    'tempo': {'by': ['Delivery_person_ID'], 'col': 'Time_taken(min)',
+              'stats': {'deliveries': 'count', 'time_mean': 'mean', 'time_std': 'std'}},
+    'avaliacao': {'by': ['Delivery_person_ID'], 'col': 'Delivery_person_Ratings',
+                  'stats': {'rating_mean': 'mean', 'rating_std': 'std'}},
+    'idade': {'by': ['Delivery_person_ID'], 'col': 'Delivery_person_Age', 'stats': {'Delivery_person_Age': 'max'}},
+}
+
+
+@timed( 'aggregate' )
+def top_delivers( df2, k=10, min_deliveries=1 ):
+    """ Esta função tem a responsabilidade de filtrar a média do tempo dos top delivers, k mais rápidos e k mais lentos
+        Tipos de ações:
+        1. Descartar entregadores com menos entregas que o mínimo
+        2. Selecionar, numa única passada agrupada por 'City', os k mais rápidos e os k mais lentos
+        3. Trazer os dois dataframes em lista
+
+        Input: Tabela 'tempo_entregador' do plano ('City', 'Delivery_person_ID', 'Time_taken(min)', 'count'),
+               k e mínimo de entregas
+        Output: Tupla (k mais rápidos por cidade, k mais lentos por cidade)
+    """
+    cols = ['City', 'Delivery_person_ID', 'Time_taken(min)']
+    df_rapidos, df_lentos = top_k_per_group( df2, 'City', 'Time_taken(min)', k=k, min_count=min_deliveries,
+                                             group_order=CITY_ORDER )
+
+    return df_rapidos.loc[:, cols], df_lentos.loc[:, cols]
+
+
+def _primary( mix, col ):
+    """ Valor de 'col' com mais entregas de cada entregador (cidade ou veículo principal) """
+    entregas = ( mix.groupby( ['Delivery_person_ID', col], observed=True )['Time_taken(min)__count']
+                        .sum()
+                        .reset_index() )
+    principal = entregas.sort_values( 'Time_taken(min)__count', ascending=False, kind='mergesort' )
+
+    return principal.drop_duplicates( 'Delivery_person_ID' ).set_index( 'Delivery_person_ID' )[col]
+
+
+@timed( 'aggregate' )
+def deliverer_profiles( profile, mix ):
+    """ Esta função tem a responsabilidade de montar o perfil de cada entregador
+        Tipos de ações:
+        1. Consolidar o perfil diário (já filtrado) por entregador: entregas, média e desvio padrão
+           da avaliação e do tempo de entrega, e idade
+        2. Escolher a cidade e o veículo com mais entregas de cada um, em todo o histórico
+
+        Input: Agregados 'deliverers' (perfil diário dos entregadores, filtrado) e 'deliverer_mix'
+               (entregas por entregador, cidade e veículo)
+        Output: Dataframe com uma linha por entregador
+    """
+    tabelas = run_plan( None, PROFILE_PLAN, aggregates={'deliverers': profile} )
+    df_aux = ( tabelas['tempo']
+                 .merge( tabelas['avaliacao'], on='Delivery_person_ID' )
+                 .merge( tabelas['idade'], on='Delivery_person_ID' ) )
+    for col in ['City', 'Type_of_vehicle']:
+        df_aux[col] = df_aux['Delivery_person_ID'].map( _primary( mix, col ) )
+
+    return df_aux
+
+
+# Estatísticas da página, calculadas de uma vez pelo plano de agregação
+PAGE_PLAN = {
+    'idade': {'by': [], 'col': 'Delivery_person_Age', 'stats': {'maior_idade': 'max', 'menor_idade': 'min'}},
+    'condicao': {'by': [], 'col': 'Vehicle_condition', 'stats': {'melhor_condicao': 'max', 'pior_condicao': 'min'}},
+    'avaliacao_transito': {'by': ['Road_traffic_density'], 'col': 'Delivery_person_Ratings',
+                           'stats': {'delivery_mean': 'mean', 'delivery_std': 'std'}},
+    'avaliacao_clima': {'by': ['Weatherconditions'], 'col': 'Delivery_person_Ratings',
+                        'stats': {'delivery_mean': 'mean', 'delivery_std': 'std'}},
+    'tempo_entregador': {'by': ['City', 'Delivery_person_ID'], 'col': 'Time_taken(min)',
+                         'stats': {'Time_taken(min)': 'mean', 'count': 'count'}},
+}
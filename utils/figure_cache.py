@@ -0,0 +1,101 @@
+# Libraries
+import collections
+import os
+import threading
+import time
+
+from utils.timing import stage
+
+# Número máximo de figuras guardadas (ex.: LAPLACE_FIGURE_CACHE_SIZE=256). Com 0 o cache fica desligado.
+FIGURE_CACHE_SIZE = int( os.environ.get( 'LAPLACE_FIGURE_CACHE_SIZE', '128' ) )
+
+# Segundos que uma figura pode ficar no cache (ex.: LAPLACE_FIGURE_CACHE_TTL=600)
+FIGURE_CACHE_TTL = float( os.environ.get( 'LAPLACE_FIGURE_CACHE_TTL', '3600' ) )
+
+
+# Cache compartilhado por todas as páginas e sessões do processo, do mais antigo para o mais
+# recente uso: chave -> (momento da gravação, figura)
+_FIGURES = collections.OrderedDict()
+_FIGURES_LOCK = threading.Lock()
+_STATS = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+
+
+def figure_key( func, version, date_slider, traffic_options, **kwargs ):
+    """ Chave do cache: função do gráfico, versão dos dados, data limite, conjunto de trânsitos
+        (a ordem das opções marcadas não muda o filtro) e os parâmetros nomeados da função
+    """
+    return ( func.__module__, func.__qualname__, version, date_slider, frozenset( traffic_options ),
+             tuple( sorted( kwargs.items() ) ) )
+
+
+def _get( chave ):
+    with _FIGURES_LOCK:
+        registro = _FIGURES.get( chave )
+        if registro is not None and time.monotonic() - registro[0] > FIGURE_CACHE_TTL:
+            del _FIGURES[chave]
+            _STATS['expired'] += 1
+            registro = None
+
+        if registro is None:
+            _STATS['misses'] += 1
+            return None
+
+        _FIGURES.move_to_end( chave )
+        _STATS['hits'] += 1
+
+        return registro[1]
+
+
+def _put( chave, fig ):
+    with _FIGURES_LOCK:
+        _FIGURES[chave] = ( time.monotonic(), fig )
+        _FIGURES.move_to_end( chave )
+        while len( _FIGURES ) > FIGURE_CACHE_SIZE:
+            _FIGURES.popitem( last=False )
+            _STATS['evictions'] += 1
+
+
+def cached_figure( func, version, date_slider, traffic_options, *args, source=None, **kwargs ):
+    """ Esta função tem a responsabilidade de reaproveitar figuras já montadas
+        Tipos de ações:
+        1. Procurar a figura pela chave (função, versão dos dados, data limite, trânsitos)
+        2. Se achar (e não tiver passado do FIGURE_CACHE_TTL), devolver a figura sem agregar nem montar nada
+        3. Senão, montar os dados (com 'source', uma função sem argumentos que devolve o primeiro
+           argumento já filtrado), chamar a função, guardar a figura e descartar as menos usadas
+           além do FIGURE_CACHE_SIZE
+
+        Os argumentos posicionais não entram na chave (como os '_' do st.cache_data): eles precisam
+        ser determinados pela versão e pelos filtros. As figuras são compartilhadas entre sessões
+        e não devem ser alteradas depois de montadas.
+
+        Input: Função do gráfico, versão dos dados, data limite, opções de trânsito, argumentos da função
+               e, opcionalmente, a função que monta os dados
+        Output: Figura
+    """
+    chave = figure_key( func, version, date_slider, traffic_options, **kwargs )
+    fig = _get( chave ) if FIGURE_CACHE_SIZE > 0 else None
+    if fig is not None:
+        return fig
+
+    if source is not None:
+        with stage( 'source.{}'.format( func.__name__ ) ):
+            args = ( source(), ) + args
+    fig = func( *args, **kwargs )
+    if FIGURE_CACHE_SIZE > 0:
+        _put( chave, fig )
+
+    return fig
+
+
+def figure_cache_stats():
+    """ Contadores do cache de figuras: acertos, faltas, descartes por tamanho e por TTL, e ocupação """
+    with _FIGURES_LOCK:
+        return {**_STATS, 'size': len( _FIGURES ), 'max_size': FIGURE_CACHE_SIZE}
+
+
+def clear_figure_cache():
+    """ Esvazia o cache de figuras e zera os contadores """
+    with _FIGURES_LOCK:
+        _FIGURES.clear()
+        for nome in _STATS:
+            _STATS[nome] = 0
@@ -0,0 +1,70 @@
+# Libraries
+import numpy as np
+import pandas as pd
+
+from utils.timing import timed
+
+
+def date_cut( df1, date_slider ):
+    """ Esta função tem a responsabilidade de aplicar o filtro de data limite
+        Tipos de ações:
+        1. Localizar, por busca binária, a primeira linha com data >= data limite
+        2. Fatiar as linhas anteriores (fatia sem cópia)
+
+        O dataframe precisa estar ordenado por 'Order_Date' (o clean_code e o cubo garantem isso).
+
+        Input: Dataframe ordenado por data e data limite
+        Output: Dataframe com as linhas de data menor que a data limite
+    """
+    fim = df1['Order_Date'].to_numpy().searchsorted( pd.Timestamp( date_slider ).to_datetime64(), side='left' )
+
+    return df1.iloc[:fim]
+
+
+def traffic_mask( serie, traffic_options ):
+    """ Esta função tem a responsabilidade de montar a máscara do filtro de trânsito
+        Tipos de ações:
+        1. Traduzir as opções selecionadas para os códigos da coluna categórica
+        2. Consultar uma tabela de códigos -> selecionado (sem comparar textos)
+
+        Input: Coluna 'Road_traffic_density' e lista de condições de trânsito
+        Output: Array booleano ou None quando todas as condições estão selecionadas
+    """
+    if not isinstance( serie.dtype, pd.CategoricalDtype ):
+        return serie.isin( traffic_options ).to_numpy()
+
+    categorias = serie.cat.categories
+    codigos = categorias.get_indexer( list( traffic_options ) )
+    codigos = codigos[codigos >= 0]
+    if len( np.unique( codigos ) ) == len( categorias ):
+        return None
+
+    # posição extra no final (False) para o código -1 dos valores ausentes
+    selecionados = np.zeros( len( categorias ) + 1, dtype=bool )
+    selecionados[codigos] = True
+
+    return selecionados[serie.cat.codes.to_numpy()]
+
+
+@timed( 'filter' )
+def apply_filters( df1, date_slider, traffic_options, colunas=None ):
+    """ Esta função tem a responsabilidade de aplicar os filtros da barra lateral
+        Tipos de ações:
+        1. Filtro de data: busca binária na coluna ordenada 'Order_Date' (fatia, sem cópia)
+        2. Filtro de trânsito: consulta pelos códigos da coluna categórica
+        3. Só as linhas selecionadas das colunas pedidas são copiadas; sem filtro de trânsito,
+           o resultado é a própria fatia
+
+        Serve tanto para o dataframe de entregas quanto para o cubo de KPIs.
+
+        Input: Dataframe ordenado por data, data limite, lista de condições de trânsito e colunas
+               usadas pelo gráfico (padrão: todas)
+        Output: Dataframe filtrado
+    """
+    df1 = date_cut( df1, date_slider )
+
+    linhas_selecionadas = traffic_mask( df1['Road_traffic_density'], traffic_options )
+    if linhas_selecionadas is None:
+        return df1
+
+    return df1.loc[linhas_selecionadas, :] if colunas is None else df1.loc[linhas_selecionadas, list( colunas )]
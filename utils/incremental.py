@@ -0,0 +1,74 @@
+# Libraries
+import pandas as pd
+
+from utils.cube import CUBE_DIMENSIONS
+
+
+def align_categories( df_antigo, df_novo ):
+    """ Unifica as categorias das colunas categóricas dos dois dataframes, para o
+        pd.concat manter o tipo categórico (com categorias diferentes ele vira object).
+        A coluna antiga só é recodificada quando o lote traz uma categoria nova.
+    """
+    for col in df_antigo.columns:
+        if not isinstance( df_antigo[col].dtype, pd.CategoricalDtype ):
+            continue
+
+        categorias = df_antigo[col].cat.categories
+        novas = df_novo[col].cat.categories.difference( categorias )
+        if len( novas ) > 0:
+            categorias = categorias.append( novas ).sort_values()
+            df_antigo[col] = df_antigo[col].cat.set_categories( categorias )
+        df_novo[col] = df_novo[col].cat.set_categories( categorias )
+
+    return df_antigo, df_novo
+
+
+def concat_clean( df1, df_novo ):
+    """ Esta função tem a responsabilidade de juntar um lote limpo aos dados existentes
+        Tipos de ações:
+        1. Unificar as categorias das colunas categóricas
+        2. Concatenar as linhas
+        3. Manter a ordenação por 'Order_Date' (só reordena se o lote tiver datas antigas)
+
+        O resultado é um dataframe novo e contíguo (a versão publicada não muda), então cada lote copia
+        todo o histórico: o custo de um append é O(linhas existentes), não O(linhas do lote). Com lotes
+        pequenos e frequentes sobre um histórico grande, prefira juntá-los num lote só antes de
+        incorporar (python -m benchmarks.bench_append mede o custo por tamanho do histórico).
+
+        Input: Dataframe limpo existente e dataframe limpo do lote
+        Output: Dataframe limpo com as linhas dos dois
+    """
+    if len( df_novo ) == 0:
+        return df1
+
+    df1, df_novo = align_categories( df1.copy( deep=False ), df_novo )
+    em_ordem = len( df1 ) == 0 or df_novo['Order_Date'].iloc[0] >= df1['Order_Date'].iloc[-1]
+    df1 = pd.concat( [df1, df_novo], ignore_index=True )
+    if not em_ordem:
+        df1 = df1.sort_values( 'Order_Date', kind='mergesort' ).reset_index( drop=True )
+
+    return df1
+
+
+def merge_cube( cube, cube_novo ):
+    """ Esta função tem a responsabilidade de somar o cubo de um lote ao cubo existente
+        Tipos de ações:
+        1. Unificar as categorias das dimensões
+        2. Concatenar os dois cubos
+        3. Reagrupar pelas dimensões somando as medidas (custo proporcional ao tamanho do cubo)
+
+        Input: Cubo existente e cubo do lote
+        Output: Cubo atualizado
+    """
+    if len( cube_novo ) == 0:
+        return cube
+
+    cube, cube_novo = align_categories( cube.copy( deep=False ), cube_novo )
+    cube = ( pd.concat( [cube, cube_novo], ignore_index=True )
+               .groupby( CUBE_DIMENSIONS, observed=True )
+               .sum()
+               .sort_index()
+               .reset_index() )
+
+    return cube
+
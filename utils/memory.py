@@ -0,0 +1,76 @@
+# Libraries
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Bytes de um ponteiro de coluna object (cada linha aponta para um objeto Python)
+POINTER_BYTES = 8
+
+
+def _wide_bytes( serie ):
+    """ Bytes que a coluna ocuparia no layout sem esquema (texto como object, números em 64 bits),
+        calculados sem materializar esse layout: no object cada linha paga o ponteiro e o objeto
+        inteiro, como no memory_usage( deep=True ) do pandas.
+    """
+    if isinstance( serie.dtype, pd.CategoricalDtype ):
+        codes = serie.cat.codes.to_numpy()
+        tamanhos = np.array( [sys.getsizeof( c ) for c in serie.cat.categories] + [sys.getsizeof( np.nan )],
+                             dtype='int64' )
+        contagem = np.bincount( np.where( codes < 0, len( tamanhos ) - 1, codes ), minlength=len( tamanhos ) )
+        return int( POINTER_BYTES * len( serie ) + ( tamanhos * contagem ).sum() )
+
+    if serie.dtype.kind in 'iuf':
+        return 8 * len( serie )
+
+    return int( serie.memory_usage( index=False, deep=True ) )
+
+
+def memory_report( df1 ):
+    """ Esta função tem a responsabilidade de medir a memória do dataframe limpo
+        Tipos de ações:
+        1. Medir os bytes de cada coluna no esquema compacto (memory_usage com deep=True)
+        2. Estimar os bytes da mesma coluna no layout antigo (object e 64 bits)
+        3. Somar o total e calcular a redução
+
+        Input: Dataframe limpo
+        Output: Dataframe com uma linha por coluna (e o total) e as colunas 'dtype',
+                'before_bytes', 'after_bytes' e 'ratio'
+    """
+    relatorio = pd.DataFrame( {
+        'dtype': df1.dtypes.astype( str ),
+        'before_bytes': pd.Series( {col: _wide_bytes( df1[col] ) for col in df1.columns}, dtype='int64' ),
+        'after_bytes': df1.memory_usage( index=False, deep=True ).astype( 'int64' ) } )
+    relatorio.loc['total'] = ['', relatorio['before_bytes'].sum(), relatorio['after_bytes'].sum()]
+    relatorio['ratio'] = ( relatorio['before_bytes'] / relatorio['after_bytes'] ).round( 2 )
+
+    return relatorio
+
+
+def _buffer( valores ):
+    """ Array NumPy que guarda os dados de uma coluna (códigos das categorias, datas em int64, ...) """
+    for atributo in ( '_codes', '_ndarray' ):
+        if isinstance( getattr( valores, atributo, None ), np.ndarray ):
+            return getattr( valores, atributo )
+
+    return valores if isinstance( valores, np.ndarray ) else None
+
+
+def read_only( df1 ):
+    """ Esta função tem a responsabilidade de tornar os dados compartilhados imutáveis
+        Tipos de ações:
+        1. Marcar como somente leitura o array de cada bloco do dataframe (o mesmo array do snapshot,
+           quando os dados vêm do memory-map, que já é somente leitura)
+
+        Uma escrita nos dados (ex.: df1.loc[0, 'ID'] = ...) passa a falhar em vez de alterar a versão
+        vista por todas as sessões. Para criar ou trocar colunas, use uma cópia rasa (copy( deep=False )).
+
+        Input: Dataframe
+        Output: O mesmo dataframe
+    """
+    for bloco in df1._mgr.blocks:
+        buffer = _buffer( bloco.values )
+        if buffer is not None:
+            buffer.flags.writeable = False
+
+    return df1
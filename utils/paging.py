@@ -0,0 +1,81 @@
+# Libraries
+import math
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Linhas por página das tabelas paginadas
+PAGE_SIZE = 25
+
+
+def _search_mask( df_aux, busca ):
+    """ Linhas com 'busca' (sem diferenciar maiúsculas) em alguma coluna de texto ou categoria.
+        Nas categorias a busca é feita nos rótulos, não em cada linha.
+    """
+    busca = busca.strip().lower()
+    mascara = np.zeros( len( df_aux ), dtype=bool )
+    for col in df_aux.columns:
+        serie = df_aux[col]
+        if isinstance( serie.dtype, pd.CategoricalDtype ):
+            rotulos = serie.cat.categories.astype( str ).str.lower().str.contains( busca, regex=False )
+            mascara |= np.isin( serie.cat.codes.to_numpy(), np.flatnonzero( rotulos ) )
+        elif serie.dtype == object:
+            mascara |= serie.astype( str ).str.lower().str.contains( busca, regex=False ).to_numpy()
+
+    return mascara
+
+
+def page_frame( df_aux, busca='', coluna=None, crescente=True, pagina=1, tamanho=PAGE_SIZE ):
+    """ Esta função tem a responsabilidade de recortar uma página de uma tabela
+        Tipos de ações:
+        1. Filtrar as linhas que contém o texto buscado
+        2. Ordenar pela coluna escolhida (categorias pelo rótulo, vazios no final)
+        3. Recortar só as linhas da página pedida
+
+        Input: Dataframe, texto buscado, coluna de ordenação, ordem crescente, página (a partir de 1)
+               e linhas por página
+        Output: Tupla (dataframe da página, linhas encontradas, número de páginas)
+    """
+    if busca.strip():
+        df_aux = df_aux.loc[_search_mask( df_aux, busca )]
+
+    if coluna is not None:
+        chave = ( lambda serie: serie.astype( str ) ) if isinstance( df_aux[coluna].dtype, pd.CategoricalDtype ) else None
+        df_aux = df_aux.sort_values( coluna, ascending=crescente, kind='mergesort', na_position='last', key=chave )
+
+    n_linhas = len( df_aux )
+    n_paginas = max( 1, math.ceil( n_linhas / tamanho ) )
+    pagina = min( max( pagina, 1 ), n_paginas )
+    inicio = ( pagina - 1 ) * tamanho
+
+    return df_aux.iloc[inicio:inicio + tamanho], n_linhas, n_paginas
+
+
+def paged_dataframe( df_aux, key, tamanho=PAGE_SIZE ):
+    """ Esta função tem a responsabilidade de mostrar uma tabela grande paginada no servidor
+        Tipos de ações:
+        1. Desenhar os controles de busca, ordenação e página
+        2. Recortar a página com o page_frame
+        3. Enviar ao navegador só as linhas da página
+
+        Input: Dataframe, prefixo das chaves dos widgets e linhas por página
+        Output: None
+    """
+    busca = st.text_input( 'Buscar', key=key + '_busca' )
+    coluna = st.selectbox( 'Ordenar por', list( df_aux.columns ), key=key + '_ordem' )
+    decrescente = st.checkbox( 'Ordem decrescente', key=key + '_decrescente' )
+
+    # o número de páginas só é conhecido depois da busca
+    if busca.strip():
+        df_aux = df_aux.loc[_search_mask( df_aux, busca )]
+    n_paginas = max( 1, math.ceil( len( df_aux ) / tamanho ) )
+    pagina = 1
+    if n_paginas > 1:
+        pagina = st.number_input( 'Página', min_value=1, max_value=n_paginas, value=1, step=1, key=key + '_pagina' )
+
+    df_pagina, n_linhas, n_paginas = page_frame( df_aux, '', coluna, not decrescente, pagina, tamanho )
+    st.dataframe( df_pagina, use_container_width=True )
+    st.caption( '{} linhas - página {} de {}'.format( n_linhas, pagina, n_paginas ) )
+
+    return None
@@ -0,0 +1,124 @@
+# Libraries
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.cleaning import clean_code
+from utils.cube import CUBE_DIMENSIONS, CUBE_MEASURES, build_cube
+from utils.incremental import align_categories
+from utils.plan import partials_from_rows
+from utils.streaming import STREAM_AGGREGATES, merge_partials
+
+# Número de processos da limpeza (ex.: LAPLACE_WORKERS=16). Com 1 tudo roda no processo atual.
+WORKERS = int( os.environ.get( 'LAPLACE_WORKERS', '1' ) )
+
+# Formas de particionar os dados brutos entre os processos
+PARTITION_MODES = ( 'date', 'city' )
+
+# Agregados calculados pelos processos: o cubo de KPIs e os da ingestão em streaming
+PARALLEL_AGGREGATES = {'cube': {'by': CUBE_DIMENSIONS}, **STREAM_AGGREGATES}
+
+
+def _date_partitions( df_raw, n_partes ):
+    """ Divide as linhas em n_partes faixas contíguas de datas com quantidades parecidas de linhas.
+        Um mesmo dia fica sempre inteiro numa única faixa.
+    """
+    codes, datas = pd.factorize( df_raw['Order_Date'] )
+    datas = pd.to_datetime( pd.Series( datas, dtype=object ), format='%d-%m-%Y' ).to_numpy()
+    ordem = np.argsort( datas, kind='stable' )
+    posicao = np.empty( len( ordem ), dtype='int64' )
+    posicao[ordem] = np.arange( len( ordem ) )
+
+    # faixa de cada dia pela contagem acumulada de linhas, na ordem das datas
+    acumulado = np.cumsum( np.bincount( codes, minlength=len( datas ) )[ordem] )
+    faixa_do_dia = np.minimum( ( acumulado - 1 ) * n_partes // max( len( df_raw ), 1 ), n_partes - 1 )
+    faixa = faixa_do_dia[posicao][codes]
+
+    return [df_raw.loc[faixa == i] for i in range( n_partes ) if ( faixa == i ).any()]
+
+
+def _city_partitions( df_raw, n_partes ):
+    """ Divide as linhas por cidade (cidades distribuídas entre as partes) """
+    codes, _ = pd.factorize( df_raw['City'] )
+    parte = codes % n_partes
+
+    return [df_raw.loc[parte == i] for i in range( n_partes ) if ( parte == i ).any()]
+
+
+def _clean_partition( df_raw, aggregates ):
+    """ Trabalho de cada processo: clean_code e agregados parciais da partição """
+    df1 = clean_code( df_raw )
+    partes = {}
+    if 'cube' in aggregates:
+        partes['cube'] = build_cube( df1 )
+    for nome, spec in aggregates.items():
+        if nome != 'cube':
+            partes[nome] = partials_from_rows( df1, spec['by'], spec['cols'] )
+
+    return df1, partes
+
+
+def _concat_clean( partes ):
+    """ Junta as partições limpas, unificando as categorias de todas antes do pd.concat """
+    base = partes[0].copy( deep=False )
+    for parte in partes[1:]:
+        base, _ = align_categories( base, parte.copy( deep=False ) )
+    partes = [base] + [align_categories( base, parte.copy( deep=False ) )[1] for parte in partes[1:]]
+
+    return pd.concat( partes, ignore_index=True )
+
+
+def parallel_ingest( df_raw, workers=WORKERS, partition='date', aggregates=PARALLEL_AGGREGATES ):
+    """ Esta função tem a responsabilidade de limpar e agregar os dados em vários processos
+        Tipos de ações:
+        1. Particionar os dados brutos por faixa de datas ou por cidade
+        2. Rodar, em cada processo, o clean_code e os agregados parciais da sua partição
+           (por padrão o cubo de KPIs e os STREAM_AGGREGATES)
+        3. Juntar as partições limpas e consolidar os parciais de forma exata (contagem, soma e
+           soma dos quadrados, então média e desvio padrão saem iguais aos de um único processo)
+
+        Por faixa de datas, as partições já saem na ordem das datas e o resultado é idêntico ao
+        clean_code do arquivo inteiro. Por cidade, o resultado é reordenado por data e, dentro de
+        um mesmo dia, as linhas ficam agrupadas por cidade.
+
+        Input: Dataframe bruto, número de processos, modo de partição ('date' ou 'city') e agregados
+        Output: Tupla (dataframe limpo, dicionário nome -> agregado)
+    """
+    if partition not in PARTITION_MODES:
+        raise ValueError( 'Partição desconhecida: {} (use {})'.format( partition, PARTITION_MODES ) )
+
+    workers = max( 1, min( workers, len( df_raw ) ) )
+    if workers == 1:
+        resultados = [_clean_partition( df_raw, aggregates )]
+    else:
+        particoes = ( _date_partitions if partition == 'date' else _city_partitions )( df_raw, workers )
+        # spawn: o servidor do Streamlit tem várias threads, e fork com threads ativas não é seguro
+        contexto = multiprocessing.get_context( 'spawn' )
+        with ProcessPoolExecutor( max_workers=len( particoes ), mp_context=contexto ) as pool:
+            resultados = list( pool.map( _clean_partition, particoes, [aggregates] * len( particoes ) ) )
+
+    df1 = _concat_clean( [df_aux for df_aux, _ in resultados] )
+    if partition == 'city' and len( resultados ) > 1:
+        df1 = df1.sort_values( 'Order_Date', kind='mergesort' ).reset_index( drop=True )
+
+    agregados = {}
+    for nome, spec in aggregates.items():
+        # as medidas do cubo são todas somas
+        agg = {medida: 'sum' for medida in CUBE_MEASURES} if nome == 'cube' else None
+        agregados[nome] = merge_partials( [partes[nome] for _, partes in resultados], spec['by'], agg )
+
+    return df1, agregados
+
+
+def parallel_clean( df_raw, workers=WORKERS, partition='date' ):
+    """ Esta função tem a responsabilidade de aplicar o clean_code em vários processos
+        Tipos de ações:
+        1. Particionar, limpar e juntar como no parallel_ingest, sem calcular agregados
+
+        Input: Dataframe bruto, número de processos e modo de partição
+        Output: Dataframe limpo
+    """
+    return parallel_ingest( df_raw, workers, partition, aggregates={} )[0]
@@ -0,0 +1,228 @@
+# Libraries
+import numpy as np
+import pandas as pd
+
+from utils.cube import CUBE_DIMENSIONS, drop_unused_categories
+from utils.timing import timed
+
+# Estatísticas que podem ser reconstruídas a partir de agregados parciais de um agrupamento mais fino
+DECOMPOSABLE_STATS = {'count', 'sum', 'mean', 'std', 'min', 'max'}
+
+# Estatísticas que exigem uma passada própria sobre as linhas
+ROW_STATS = {'nunique', 'median'}
+
+# Agregados parciais necessários para cada estatística decomponível
+_PARTIALS = {'count': ['count'], 'sum': ['sum'], 'mean': ['count', 'sum'], 'std': ['count', 'sum', 'sumsq'],
+             'min': ['min'], 'max': ['max']}
+
+# Como cada agregado parcial é consolidado num agrupamento mais grosso
+PARTIAL_ROLLUP = {'count': 'sum', 'sum': 'sum', 'sumsq': 'sum', 'min': 'min', 'max': 'max'}
+
+# Conjuntos de chaves categóricas são unidos numa única passada enquanto o número de grupos
+# possíveis (produto das categorias) não passar deste limite
+MAX_COMBINED_GROUPS = 10_000
+
+# Medidas do cubo de KPIs, no formato de agregados parciais do tempo de entrega
+_CUBE_PARTIALS = {'count': 'count', 'sum': 'time_sum', 'sumsq': 'time_sumsq'}
+_CUBE_COLUMN = 'Time_taken(min)'
+
+
+def partial_name( col, parcial ):
+    """ Nome da coluna de um agregado parcial (ex.: 'Time_taken(min)__sum') """
+    return '{}__{}'.format( col, parcial )
+
+
+def _group( df_aux, by, agg ):
+    """ Agrupa por 'by' (ou pelo total, quando 'by' é vazio) mantendo a ordem das categorias """
+    if not by:
+        return df_aux.agg( agg ).to_frame().T.reset_index( drop=True ).infer_objects()
+
+    return drop_unused_categories( df_aux.groupby( by, observed=True ).agg( agg ).sort_index().reset_index(), by )
+
+
+def partials_from_rows( df1, by, necessidades ):
+    """ Uma única passada agrupada sobre as linhas, calculando todos os parciais pedidos """
+    colunas = {}
+    agg = {}
+    for col, parciais in necessidades.items():
+        for parcial in parciais:
+            nome = partial_name( col, parcial )
+            if parcial == 'sumsq':
+                colunas[nome] = df1[col].astype( 'float64' ) ** 2
+                agg[nome] = 'sum'
+            elif parcial == 'sum' and df1[col].dtype.kind == 'f':
+                # soma em float64: com float32 o resultado mudaria com a ordem em que as partes são somadas
+                colunas[nome] = df1[col].astype( 'float64' )
+                agg[nome] = 'sum'
+            else:
+                colunas[nome] = df1[col]
+                agg[nome] = parcial
+
+    df_aux = pd.DataFrame( {**{col: df1[col] for col in by}, **colunas} )
+
+    return _group( df_aux, by, agg )
+
+
+def _partials_from_cube( cube ):
+    """ Renomeia as medidas do cubo para o formato de agregados parciais do tempo de entrega """
+    return cube.rename( columns={medida: partial_name( _CUBE_COLUMN, parcial )
+                                 for parcial, medida in _CUBE_PARTIALS.items()} )
+
+
+def _finalize( df_aux, by, col, stats ):
+    """ Calcula as estatísticas pedidas a partir dos parciais já consolidados em 'by' """
+    df_final = df_aux.loc[:, by].copy()
+    n = df_aux[partial_name( col, 'count' )].astype( 'float64' ) if partial_name( col, 'count' ) in df_aux else None
+    for nome, stat in stats.items():
+        if stat in ( 'count', 'sum', 'min', 'max' ):
+            df_final[nome] = df_aux[partial_name( col, stat )]
+        elif stat == 'mean':
+            df_final[nome] = df_aux[partial_name( col, 'sum' )] / n
+        elif stat == 'std':
+            # variância amostral (ddof=1), como o .std() do pandas
+            soma = df_aux[partial_name( col, 'sum' )]
+            variancia = ( df_aux[partial_name( col, 'sumsq' )] - soma * soma / n ) / ( n - 1 ).where( n > 1 )
+            df_final[nome] = np.sqrt( variancia.clip( lower=0 ) )
+
+    return df_final
+
+
+def _is_subset( by, base ):
+    return set( by ) <= set( base )
+
+
+def _combine_keys( df1, maximais ):
+    """ Une conjuntos de chaves só com colunas categóricas de baixa cardinalidade (ex.: trânsito e
+        clima), para eles saírem da mesma passada; a consolidação depois é feita sobre poucos grupos.
+    """
+    def cardinalidade( chaves ):
+        total = 1
+        for col in chaves:
+            if not isinstance( df1[col].dtype, pd.CategoricalDtype ):
+                return None
+            total *= max( len( df1[col].cat.categories ), 1 )
+        return total
+
+    combinados = []
+    for chaves in maximais:
+        for i, base in enumerate( combinados ):
+            uniao = base + [col for col in chaves if col not in base]
+            total = cardinalidade( uniao )
+            if total is not None and total <= MAX_COMBINED_GROUPS:
+                combinados[i] = uniao
+                break
+        else:
+            combinados.append( list( chaves ) )
+
+    return combinados
+
+
+def _partial_keys( tabela ):
+    """ Chaves de uma tabela de parciais: as colunas que não são 'coluna__parcial' """
+    return [c for c in tabela.columns if '__' not in c]
+
+
+def plan_columns( plan ):
+    """ Colunas das entregas que o plano consulta (chaves e colunas das estatísticas), na ordem do plano """
+    colunas = []
+    for spec in plan.values():
+        colunas.extend( col for col in list( spec['by'] ) + [spec['col']] if col not in colunas )
+
+    return colunas
+
+
+@timed( 'aggregate' )
+def run_plan( df1, plan, cube=None, aggregates=None ):
+    """ Esta função tem a responsabilidade de calcular todas as estatísticas de uma página de uma vez
+        Tipos de ações:
+        1. Separar as estatísticas decomponíveis (count, sum, mean, std, min, max) das que exigem
+           as linhas (nunique, median)
+        2. Responder pelo cubo de KPIs as estatísticas do tempo de entrega que cabem nas dimensões dele
+           e, pelos agregados materializados (tabelas de parciais), as que cabem nas chaves de algum
+        3. Para as demais, fazer uma passada agrupada por conjunto maximal de chaves, calculando de
+           uma vez todos os agregados parciais (contagem, soma, soma dos quadrados, mínimo, máximo);
+           conjuntos categóricos pequenos são unidos na mesma passada
+        4. Consolidar os agrupamentos contidos num maximal a partir dos parciais dele, sem nova passada
+        5. Fazer uma passada por conjunto de chaves para nunique/median
+
+        O plano é um dicionário nome -> {'by': [colunas], 'col': coluna, 'stats': {nome_saida: estatística}}.
+
+        Input: Dataframe filtrado (pode ser None se os agregados responderem o plano todo), plano e,
+               opcionalmente, o cubo de KPIs e o dicionário de agregados materializados, filtrados
+        Output: Dicionário nome -> dataframe pronto para exibir (colunas de 'by' + colunas de 'stats')
+    """
+    resultado = {}
+    decomponiveis = {}
+    por_linhas = {}
+    for nome, spec in plan.items():
+        stats = set( spec['stats'].values() )
+        if not stats <= DECOMPOSABLE_STATS | ROW_STATS:
+            raise ValueError( 'Estatística não suportada em {}: {}'.format( nome, stats - DECOMPOSABLE_STATS - ROW_STATS ) )
+        if stats & ROW_STATS and stats & DECOMPOSABLE_STATS:
+            raise ValueError( 'Não misture {} com estatísticas decomponíveis em {}'.format( ROW_STATS, nome ) )
+        ( por_linhas if stats & ROW_STATS else decomponiveis )[nome] = spec
+
+    # 2. estatísticas respondidas pelo cubo
+    pendentes = {}
+    df_cubo = _partials_from_cube( cube ) if cube is not None else None
+    for nome, spec in decomponiveis.items():
+        parciais = { p for stat in spec['stats'].values() for p in _PARTIALS[stat] }
+        if ( df_cubo is not None and spec['col'] == _CUBE_COLUMN and _is_subset( spec['by'], CUBE_DIMENSIONS )
+                and parciais <= set( _CUBE_PARTIALS ) ):
+            agg = { partial_name( _CUBE_COLUMN, p ): 'sum' for p in _CUBE_PARTIALS }
+            resultado[nome] = _finalize( _group( df_cubo, spec['by'], agg ), spec['by'], spec['col'], spec['stats'] )
+        else:
+            pendentes[nome] = spec
+
+    # 2. estatísticas respondidas pelos agregados materializados (a menor tabela que tiver chaves e parciais)
+    tabelas = sorted( ( aggregates or {} ).values(), key=len )
+    for nome, spec in list( pendentes.items() ):
+        parciais = []
+        for stat in spec['stats'].values():
+            parciais.extend( p for p in _PARTIALS[stat] if p not in parciais )
+        colunas = [partial_name( spec['col'], p ) for p in parciais]
+        tabela = next( ( t for t in tabelas if _is_subset( spec['by'], _partial_keys( t ) )
+                         and set( colunas ) <= set( t.columns ) ), None )
+        if tabela is not None:
+            agg = { c: PARTIAL_ROLLUP[c.rsplit( '__', 1 )[1]] for c in colunas }
+            df_aux = _group( tabela.loc[:, spec['by'] + colunas], spec['by'], agg )
+            resultado[nome] = _finalize( df_aux, spec['by'], spec['col'], spec['stats'] )
+            del pendentes[nome]
+
+    # 3. conjuntos maximais de chaves: uma passada sobre as linhas para cada um
+    chaves = []
+    for spec in pendentes.values():
+        if not any( set( spec['by'] ) == set( k ) for k in chaves ):
+            chaves.append( list( spec['by'] ) )
+    maximais = _combine_keys( df1, [k for k in chaves if not any( set( k ) < set( outro ) for outro in chaves )] )
+
+    atribuicao = { nome: next( k for k in maximais if _is_subset( spec['by'], k ) ) for nome, spec in pendentes.items() }
+    for base in maximais:
+        necessidades = {}
+        for nome, spec in pendentes.items():
+            if atribuicao[nome] is base:
+                parciais = necessidades.setdefault( spec['col'], [] )
+                for stat in spec['stats'].values():
+                    parciais.extend( p for p in _PARTIALS[stat] if p not in parciais )
+        df_base = partials_from_rows( df1, base, necessidades )
+
+        # 4. agrupamentos contidos na base são consolidados a partir dos parciais
+        for nome, spec in pendentes.items():
+            if atribuicao[nome] is not base:
+                continue
+            df_aux = df_base
+            if set( spec['by'] ) != set( base ):
+                agg = { c: PARTIAL_ROLLUP[c.rsplit( '__', 1 )[1]] for c in df_base.columns if c not in base }
+                df_aux = _group( df_base.loc[:, spec['by'] + list( agg )], spec['by'], agg )
+            resultado[nome] = _finalize( df_aux, spec['by'], spec['col'], spec['stats'] )
+
+    # 5. estatísticas que precisam das linhas
+    for nome, spec in por_linhas.items():
+        agg = { saida: ( spec['col'], stat ) for saida, stat in spec['stats'].items() }
+        if spec['by']:
+            resultado[nome] = drop_unused_categories(
+                df1.groupby( spec['by'], observed=True ).agg( **agg ).sort_index().reset_index(), spec['by'] )
+        else:
+            resultado[nome] = pd.DataFrame( { saida: [df1[col].agg( stat )] for saida, ( col, stat ) in agg.items() } )
+
+    return resultado
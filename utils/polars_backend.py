@@ -0,0 +1,225 @@
+# Libraries
+import threading
+
+import pandas as pd
+
+from utils.cube import CUBE_DIMENSIONS
+from utils.streaming import STREAM_AGGREGATES, filters_for
+from utils.timing import timed
+
+# Colunas somadas em float64, como no partials_from_rows (o snapshot guarda float32)
+_FLOAT_TYPES = ( 'Float32', 'Float64' )
+
+
+def _polars():
+    try:
+        import polars
+    except ImportError:
+        raise ImportError( 'O backend Polars precisa do polars (pip install polars), ou use LAPLACE_BACKEND=pandas' )
+
+    return polars
+
+
+# Snapshot aberto convertido para o Polars, um por arquivo: caminho -> (tabela Arrow, DataFrame Polars)
+_FRAMES = {}
+_FRAMES_LOCK = threading.Lock()
+
+
+def _frame( snapshot ):
+    """ DataFrame Polars do snapshot, convertido uma vez por versão a partir da tabela Arrow em memory-map
+        (as colunas numéricas não são copiadas). A consulta lê a tabela do snapshot fixado no rerun, não
+        o arquivo, que pode ter sido trocado por uma versão nova no meio do rerun.
+    """
+    with _FRAMES_LOCK:
+        atual = _FRAMES.get( snapshot['path'] )
+        if atual is None or atual[0] is not snapshot['table']:
+            atual = _FRAMES[snapshot['path']] = ( snapshot['table'], _polars().from_arrow( snapshot['table'] ) )
+
+        return atual[1]
+
+
+def _scan( snapshot, date_slider, traffic_options, by ):
+    """ Esta função tem a responsabilidade de montar a leitura preguiçosa das entregas filtradas
+        Tipos de ações:
+        1. Partir do DataFrame Polars do snapshot fixado no rerun (convertido uma vez por versão)
+        2. Adicionar os filtros da barra lateral (nenhum sem data limite, None) e a exclusão de
+           chaves nulas (o groupby do pandas descarta os grupos com chave ausente)
+
+        Nada é calculado aqui: o otimizador do Polars junta filtro, agrupamento e agregação num único
+        plano e só lê as colunas usadas quando a consulta é coletada.
+
+        Input: Snapshot aberto, data limite, opções de trânsito e chaves do agrupamento
+        Output: LazyFrame filtrado
+    """
+    pl = _polars()
+    filtro = pl.lit( True )
+    if date_slider is not None:
+        opcoes = list( traffic_options )
+        filtro = pl.col( 'Order_Date' ) < pd.Timestamp( date_slider ).to_pydatetime()
+        if not opcoes:
+            filtro = filtro & pl.lit( False )
+        else:
+            filtro = filtro & pl.col( 'Road_traffic_density' ).cast( pl.Utf8 ).is_in( opcoes )
+    for col in by:
+        filtro = filtro & pl.col( col ).is_not_null()
+
+    return _frame( snapshot ).lazy().filter( filtro )
+
+
+def _value( schema, col ):
+    """ Coluna numérica pronta para somar: float32 vira float64 """
+    pl = _polars()
+    valor = pl.col( col )
+
+    return valor.cast( pl.Float64 ) if str( schema[col] ) in _FLOAT_TYPES else valor
+
+
+def _stat( schema, stat, col ):
+    """ Expressão Polars de uma estatística do plano (variância amostral, como o .std() do pandas) """
+    pl = _polars()
+    valor = _value( schema, col )
+    expressoes = {'count': lambda: pl.col( col ).count().cast( pl.Int64 ),
+                  'sum': lambda: valor.sum(),
+                  'mean': lambda: valor.mean(),
+                  'std': lambda: valor.std( ddof=1 ),
+                  'min': lambda: pl.col( col ).min(),
+                  'max': lambda: pl.col( col ).max(),
+                  'nunique': lambda: pl.col( col ).drop_nulls().n_unique().cast( pl.Int64 ),
+                  'median': lambda: valor.median()}
+
+    return expressoes[stat]()
+
+
+def _partial( schema, parcial, col ):
+    """ Expressão Polars de um agregado parcial, com os mesmos tipos do partials_from_rows """
+    pl = _polars()
+    valor = _value( schema, col )
+    expressoes = {'count': lambda: pl.col( col ).count().cast( pl.Int64 ),
+                  'sum': lambda: valor.sum(),
+                  'sumsq': lambda: ( pl.col( col ).cast( pl.Float64 ) ** 2 ).sum(),
+                  'min': lambda: pl.col( col ).min(),
+                  'max': lambda: pl.col( col ).max()}
+
+    return expressoes[parcial]()
+
+
+def _grouped( lazy, by, expressoes ):
+    """ Agrupamento pelas chaves (categorias como texto, para ordenar pelo rótulo) ou agregação total """
+    pl = _polars()
+    if not by:
+        return lazy.select( expressoes )
+
+    chaves = [pl.col( col ) if col == 'Order_Date' else pl.col( col ).cast( pl.Utf8 ) for col in by]
+
+    return lazy.group_by( chaves ).agg( expressoes ).sort( by )
+
+
+def _to_pandas( df_pl, snapshot ):
+    """ Resultado no pandas, com as colunas de texto categóricas de volta nas categorias do snapshot
+        (contagens com o nome de uma coluna categórica, como 'Delivery_person_ID', ficam numéricas)
+    """
+    categorias = snapshot['categories']
+    df_aux = df_pl.to_pandas()
+    for col in df_aux.columns:
+        if col in categorias and df_aux[col].dtype.kind not in 'fiu':
+            df_aux[col] = pd.Categorical( df_aux[col], categories=categorias[col] )
+
+    return df_aux
+
+
+def _collect( snapshot, consultas ):
+    """ Coleta várias consultas de uma vez: o Polars otimiza e executa os planos juntos, em paralelo """
+    return [_to_pandas( df_pl, snapshot ) for df_pl in _polars().collect_all( consultas )]
+
+
+def stats_query( consultas, date_slider, traffic_options, snapshot ):
+    """ Esta função tem a responsabilidade de calcular as estatísticas de um plano no Polars
+        Tipos de ações:
+        1. Montar uma consulta preguiçosa (filtro + agrupamento + agregação) por conjunto de chaves
+        2. Coletar todas as consultas de uma vez
+
+        Input: Lista de ( chaves, [( apelido, estatística, coluna )] ) (backend.plan_queries), data limite,
+               opções de trânsito e snapshot aberto
+        Output: Lista de dataframes (chaves + uma coluna por apelido), na ordem das consultas
+    """
+    lazies = []
+    for by, estatisticas in consultas:
+        lazy = _scan( snapshot, date_slider, traffic_options, by )
+        schema = lazy.schema
+        expressoes = [_stat( schema, stat, col ).alias( apelido ) for apelido, stat, col in estatisticas]
+        lazies.append( _grouped( lazy, by, expressoes ) )
+
+    return _collect( snapshot, lazies )
+
+
+def _partials_lazy( by, necessidades, date_slider, traffic_options, snapshot ):
+    """ Consulta preguiçosa dos agregados parciais no formato do partials_from_rows ('coluna__parcial') """
+    lazy = _scan( snapshot, date_slider, traffic_options, by )
+    schema = lazy.schema
+    expressoes = [_partial( schema, parcial, col ).alias( '{}__{}'.format( col, parcial ) )
+                  for col, parciais in necessidades.items() for parcial in parciais]
+
+    return _grouped( lazy, by, expressoes )
+
+
+@timed( 'aggregate' )
+def partials_query( by, necessidades, date_slider, traffic_options, snapshot ):
+    """ Esta função tem a responsabilidade de calcular agregados parciais no Polars
+        Tipos de ações:
+        1. Montar contagem, soma, soma dos quadrados, mínimo e máximo pedidos, já filtrados
+        2. Devolver no formato do partials_from_rows ('coluna__parcial')
+
+        Input: Chaves, parciais por coluna, data limite, opções de trânsito e snapshot aberto
+        Output: Dataframe de parciais
+    """
+    return _collect( snapshot, [_partials_lazy( by, necessidades, date_slider, traffic_options, snapshot )] )[0]
+
+
+@timed( 'aggregate' )
+def aggregates_query( date_slider, traffic_options, snapshot, aggregates=STREAM_AGGREGATES ):
+    """ Agregados materializados (perfil diário dos entregadores, ...) calculados no Polars, já filtrados
+        (os agregados sem 'Order_Date' na chave cobrem todo o histórico, como no caminho pandas)
+    """
+    consultas = [_partials_lazy( spec['by'], spec['cols'], *filters_for( spec, date_slider, traffic_options ), snapshot )
+                 for spec in aggregates.values()]
+
+    return dict( zip( aggregates, _collect( snapshot, consultas ) ) )
+
+
+@timed( 'aggregate' )
+def cube_query( date_slider, traffic_options, snapshot ):
+    """ Esta função tem a responsabilidade de montar o cubo de KPIs no Polars
+        Tipos de ações:
+        1. Agrupar as entregas filtradas pelas dimensões do cubo
+        2. Calcular contagem, soma e soma dos quadrados do tempo de entrega
+
+        Input: Data limite, opções de trânsito e snapshot aberto
+        Output: Cubo filtrado, com as mesmas colunas do build_cube
+    """
+    pl = _polars()
+    tempo = pl.col( 'Time_taken(min)' ).cast( pl.Float64 )
+    expressoes = [pl.len().cast( pl.Int64 ).alias( 'count' ), tempo.sum().alias( 'time_sum' ),
+                  ( tempo ** 2 ).sum().alias( 'time_sumsq' )]
+    lazy = _scan( snapshot, date_slider, traffic_options, CUBE_DIMENSIONS )
+
+    return _collect( snapshot, [_grouped( lazy, CUBE_DIMENSIONS, expressoes )] )[0]
+
+
+@timed( 'aggregate' )
+def weekly_orders_query( date_slider, traffic_options, snapshot ):
+    """ Pedidos e entregadores únicos por semana do ano, no formato do weekly_orders """
+    pl = _polars()
+    lazy = _scan( snapshot, date_slider, traffic_options, [] )
+    consulta = ( lazy.group_by( pl.col( 'Order_Date' ).dt.strftime( '%U' ).alias( 'week_of_year' ) )
+                     .agg( [pl.col( 'ID' ).count().cast( pl.Int64 ),
+                            pl.col( 'Delivery_person_ID' ).drop_nulls().n_unique().cast( pl.Int64 )] )
+                     .sort( 'week_of_year' ) )
+
+    return _collect( snapshot, [consulta] )[0]
+
+
+def rows_query( colunas, date_slider, traffic_options, snapshot ):
+    """ Linhas filtradas, só com as colunas pedidas (ex.: coordenadas do mapa) """
+    lazy = _scan( snapshot, date_slider, traffic_options, [] ).select( list( colunas ) )
+
+    return _collect( snapshot, [lazy] )[0]
@@ -0,0 +1,51 @@
+# Libraries
+import numpy as np
+
+
+def _k_smallest( valores, k ):
+    """ Posições dos k menores valores, em ordem crescente e, nos empates, na ordem das posições
+        (como a ordenação estável): seleção parcial (argpartition) para achar o k-ésimo valor, e
+        ordenação só dos valores até ele, com todos os empatados no corte.
+    """
+    posicoes = np.arange( len( valores ) )
+    if k < len( valores ):
+        limite = valores[np.argpartition( valores, k - 1 )[k - 1]]
+        # limite NaN: menos de k valores presentes, todos entram (os NaN ficam no final)
+        if not np.isnan( limite ):
+            posicoes = np.flatnonzero( valores <= limite )
+
+    return posicoes[np.argsort( valores[posicoes], kind='stable' )][:k]
+
+
+def top_k_per_group( df_aux, group_col, value_col, k=10, min_count=1, count_col='count', group_order=None ):
+    """ Esta função tem a responsabilidade de selecionar os k menores e os k maiores valores de cada grupo
+        Tipos de ações:
+        1. Descartar as linhas com contagem abaixo do mínimo
+        2. Separar as posições de cada grupo numa única passada (groupby.indices)
+        3. Selecionar, por seleção parcial, os k menores e os k maiores de cada grupo; nos empates
+           vale a ordem das linhas (a do sort_values estável por grupo e valor)
+        4. Juntar os grupos na ordem pedida em 'group_order' e, depois, os demais na ordem em que
+           aparecem nas linhas
+
+        Input: Dataframe com uma linha por item, coluna do grupo, coluna do valor, k,
+               contagem mínima, coluna da contagem e ordem dos grupos
+        Output: Tupla (dataframe dos k menores por grupo, dataframe dos k maiores por grupo)
+    """
+    if min_count > 1:
+        df_aux = df_aux.loc[df_aux[count_col] >= min_count, :]
+
+    valores = df_aux[value_col].to_numpy( dtype='float64' )
+    grupos = df_aux.groupby( group_col, observed=True ).indices
+    menores, maiores = [], []
+    primeiros = [grupo for grupo in ( group_order or [] ) if grupo in grupos]
+    demais = sorted( ( grupo for grupo in grupos if grupo not in primeiros ), key=lambda grupo: grupos[grupo][0] )
+    for grupo in primeiros + demais:
+        posicoes = grupos[grupo]
+        menores.append( posicoes[_k_smallest( valores[posicoes], k )] )
+        maiores.append( posicoes[_k_smallest( -valores[posicoes], k )] )
+
+    if not grupos:
+        return df_aux.iloc[:0], df_aux.iloc[:0]
+
+    return ( df_aux.iloc[np.concatenate( menores )].reset_index( drop=True ),
+             df_aux.iloc[np.concatenate( maiores )].reset_index( drop=True ) )
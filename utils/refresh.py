@@ -0,0 +1,88 @@
+# Libraries
+import atexit
+import logging
+import os
+import threading
+import time
+
+# Segundos entre duas verificações da fonte de dados em segundo plano (ex.: LAPLACE_REFRESH_INTERVAL=30).
+# Com 0 não há thread: a verificação e a ingestão voltam a acontecer no próprio rerun.
+REFRESH_INTERVAL = float( os.environ.get( 'LAPLACE_REFRESH_INTERVAL', '5' ) )
+
+_LOGGER = logging.getLogger( __name__ )
+
+
+# Threads de atualização em execução no processo: nome -> dicionário com a thread, o evento de
+# parada, a última verificação e o último erro
+_WORKERS = {}
+_WORKERS_LOCK = threading.Lock()
+
+
+def _loop( worker, func, args, interval ):
+    """ Chama a função a cada 'interval' segundos até o evento de parada. Um erro (ex.: CSV
+        sendo gravado) fica registrado e a próxima verificação tenta de novo.
+    """
+    while not worker['stop'].wait( interval ):
+        try:
+            func( *args )
+            worker['error'] = None
+        except Exception as erro:
+            worker['error'] = repr( erro )
+            _LOGGER.exception( 'Falha na atualização em segundo plano (%s)', worker['thread'].name )
+        worker['last_check'] = time.time()
+
+
+def start_refresh_worker( nome, func, *args, interval=None ):
+    """ Esta função tem a responsabilidade de manter uma thread de atualização por fonte de dados
+        Tipos de ações:
+        1. Não fazer nada se a thread 'nome' já estiver rodando (pode ser chamada a cada rerun)
+        2. Senão, iniciar uma thread daemon que chama func( *args ) a cada REFRESH_INTERVAL segundos
+
+        A função roda fora do rerun: ela deve montar a versão nova dos dados por completo e só então
+        trocar a referência compartilhada, para as sessões nunca esperarem pela ingestão.
+
+        Input: Nome da thread, função de atualização, argumentos e intervalo (padrão: REFRESH_INTERVAL)
+        Output: True se a thread foi iniciada agora, False se já estava rodando ou se o intervalo é 0
+    """
+    interval = REFRESH_INTERVAL if interval is None else interval
+    if interval <= 0:
+        return False
+
+    with _WORKERS_LOCK:
+        atual = _WORKERS.get( nome )
+        if atual is not None and atual['thread'].is_alive():
+            return False
+
+        worker = {'stop': threading.Event(), 'last_check': None, 'error': None}
+        worker['thread'] = threading.Thread( target=_loop, args=( worker, func, args, interval ),
+                                             name='refresh:{}'.format( nome ), daemon=True )
+        _WORKERS[nome] = worker
+        worker['thread'].start()
+
+        return True
+
+
+def stop_refresh_workers():
+    """ Para todas as threads de atualização e espera cada uma terminar a verificação em andamento """
+    with _WORKERS_LOCK:
+        workers = list( _WORKERS.values() )
+        _WORKERS.clear()
+
+    for worker in workers:
+        worker['stop'].set()
+    for worker in workers:
+        worker['thread'].join()
+
+
+# No encerramento do processo (ex.: Ctrl+C no streamlit run), as threads terminam a verificação em
+# andamento antes de o interpretador sair, sem deixar uma ingestão pela metade
+atexit.register( stop_refresh_workers )
+
+
+def refresh_workers_status():
+    """ Situação das threads de atualização, mostrada no painel 'Performance' (LAPLACE_PERF=1):
+        nome -> (viva, momento da última verificação, último erro)
+    """
+    with _WORKERS_LOCK:
+        return {nome: ( worker['thread'].is_alive(), worker['last_check'], worker['error'] )
+                for nome, worker in _WORKERS.items()}
@@ -0,0 +1,55 @@
+# Libraries
+import functools
+
+# Logo da barra lateral
+LOGO_PATH = 'pngwing.com.png'
+
+
+# Bibliotecas de gráficos e mapas importadas só quando um gráfico é montado: cada página (e cada
+# aba) paga somente pelas bibliotecas que desenha. Depois da primeira chamada, o Python devolve o
+# módulo já carregado (sys.modules), sem custo.
+
+
+def plotly_express():
+    """ Módulo plotly.express """
+    import plotly.express as px
+
+    return px
+
+
+def graph_objects():
+    """ Módulo plotly.graph_objects """
+    import plotly.graph_objects as go
+
+    return go
+
+
+def folium():
+    """ Módulo folium """
+    import folium
+
+    return folium
+
+
+def fast_marker_cluster():
+    """ Classe FastMarkerCluster do folium.plugins """
+    from folium.plugins import FastMarkerCluster
+
+    return FastMarkerCluster
+
+
+@functools.lru_cache( maxsize=None )
+def logo( path=LOGO_PATH ):
+    """ Esta função tem a responsabilidade de carregar o logo da barra lateral
+        Tipos de ações:
+        1. Abrir a imagem com o PIL e decodificar os pixels uma única vez por processo
+
+        Input: Caminho da imagem
+        Output: Imagem do PIL (compartilhada entre páginas e sessões: não alterar)
+    """
+    from PIL import Image
+
+    imagem = Image.open( path )
+    imagem.load()
+
+    return imagem
@@ -0,0 +1,112 @@
+# Libraries
+import numpy as np
+
+from utils import rendering
+from utils.timing import timed
+
+
+@timed( 'figure' )
+def avg_std_time_on_traffic( df_aux ):
+    """
+        Esta função plota o Tempo médio e desvio padrão de entrega por cidade' num gráfico de sunburst
+        Parâmetros:
+        Input:
+         - df_aux: Tabela do plano de agregação ('City', 'Road_traffic_density', 'avg_time', 'std_time')
+          'avg_time' : Tempo médio
+          'std_time': Desvio padrão do tempo
+          Output:
+        - fig: Gráfico de sunburst
+    """  
+    df_aux = round( df_aux, 2 )
+                                       
+    px = rendering.plotly_express()
+    fig = px.sunburst(df_aux, path=['City', 'Road_traffic_density'], values='avg_time', color='std_time', color_continuous_scale='RdBu',            color_continuous_midpoint=np.average(df_aux['std_time']))          
+           
+    return fig
+
+
+
+@timed( 'figure' )
+def avg_std_time_graph( df_aux ):
+    """
+    Esta função plota o tempo médio e desvio padrão de entrega por cidade num gráfico de barras
+    Parâmetros:
+    Input:
+     - df_aux: Tabela do plano de agregação ('City', 'avg_time', 'std_time')
+      'avg_time' : Tempo médio
+      'std_time': Desvio padrão do tempo
+      Output:
+    - fig: Gráfico de barras
+    """
+
+    df_aux = round( df_aux, 2 )
+                
+    go = rendering.graph_objects()
+    fig = go.Figure()
+    fig.add_trace(go.Bar( name='Control', x=df_aux['City'], y=df_aux['avg_time'], error_y=dict(type='data', array=df_aux['std_time'])))
+    fig.update_layout(barmode='group')
+
+    return fig
+
+
+
+@timed( 'aggregate' )
+def avg_std_time_delivery( df_aux, festival, op ):
+    """
+    Esta função seleciona o tempo médio ou o desvio padrão do tempo de entrega
+    Parâmetros:
+    Input:
+     - df_aux: Tabela do plano de agregação ('Festival', 'avg_time', 'std_time')
+     - festival: 'Yes' ou 'No'
+     - op: Tipo de operação
+      'avg_time' : Tempo médio
+      'std_time': Desvio padrão do tempo
+      Output:
+    - df: Série com 1 linha (None se os filtros não deixaram entregas nesse grupo)
+    """
+    df_aux = round( df_aux.loc[df_aux['Festival'] == festival, op], 2)
+    if len( df_aux ) == 0:
+        # o st.metric não aceita série vazia; com None ele mostra '—'
+        return None
+
+    return df_aux
+
+
+
+@timed( 'figure' )
+def distance ( tabelas, fig ):
+    """
+    Esta função apresenta a distância média dos restaurantes e dos locais de entrega
+    Parâmetros:
+    Input:
+     - tabelas: Resultado do plano de agregação ('distancia' e 'distancia_cidade')
+     - fig: False para a média geral, True para o gráfico de pizza por cidade
+      Output:
+    - Distância média (km) ou gráfico de pizza
+    """
+    # A coluna 'distance' já vem calculada do clean_code (haversine vetorizado)
+    if fig == False:
+        # A distância média dos resturantes e dos locais de entrega.
+        avg_distance = round( tabelas['distancia'].loc[0, 'distance'], 2)
+                                
+        return avg_distance
+
+    else:
+        avg_distance = round( tabelas['distancia_cidade'], 2)
+        go = rendering.graph_objects()
+        fig = go.Figure( data=[go.Pie(labels=avg_distance['City'], values=avg_distance['distance'], pull=[0, 0.1, 0])])
+                
+        return fig
+
+# Estatísticas da página, calculadas de uma vez pelo plano de agregação
+PAGE_PLAN = {
+    'entregadores': {'by': [], 'col': 'Delivery_person_ID', 'stats': {'delivery_unique': 'nunique'}},
+    'distancia': {'by': [], 'col': 'distance', 'stats': {'distance': 'mean'}},
+    'distancia_cidade': {'by': ['City'], 'col': 'distance', 'stats': {'distance': 'mean'}},
+    'tempo_festival': {'by': ['Festival'], 'col': 'Time_taken(min)', 'stats': {'avg_time': 'mean', 'std_time': 'std'}},
+    'tempo_cidade': {'by': ['City'], 'col': 'Time_taken(min)', 'stats': {'avg_time': 'mean', 'std_time': 'std'}},
+    'tempo_cidade_transito': {'by': ['City', 'Road_traffic_density'], 'col': 'Time_taken(min)',
+                              'stats': {'avg_time': 'mean', 'std_time': 'std'}},
+    'tempo_cidade_pedido': {'by': ['City', 'Type_of_order'], 'col': 'Time_taken(min)',
+                            'stats': {'avg_time': 'mean', 'std_time': 'std'}},
+}
@@ -0,0 +1,241 @@
+# Libraries
+import os
+import sys
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from utils.cleaning import clean_code
+from utils.cube import CUBE_DIMENSIONS, CUBE_MEASURES
+from utils.parallel import WORKERS, parallel_clean
+from utils.plan import partial_name
+from utils.refresh import REFRESH_INTERVAL, start_refresh_worker
+from utils.streaming import STREAM_AGGREGATES, aggregate_path
+from utils.timing import stage
+
+# Chave usada nos metadados do arquivo Arrow para guardar a versão do CSV de origem
+SIGNATURE_KEY = b'source_signature'
+
+# Versão do formato do snapshot: incrementar sempre que o clean_code mudar o resultado
+SNAPSHOT_VERSION = 5
+
+
+def snapshot_path( csv_path ):
+    """ Esta função tem a responsabilidade de definir o caminho do snapshot
+        Tipos de ações:
+        1. Trocar a extensão do CSV por '.feather'
+
+        Input: Caminho do arquivo CSV
+        Output: Caminho do arquivo Feather (Arrow IPC)
+    """
+    return os.path.splitext( csv_path )[0] + '.feather'
+
+
+def source_signature( path ):
+    """ Esta função tem a responsabilidade de identificar a versão do arquivo de dados
+        Tipos de ações:
+        1. Ler os metadados do arquivo (data de modificação e tamanho)
+
+        Input: Caminho do arquivo
+        Output: Tupla (mtime em nanossegundos, tamanho em bytes)
+    """
+    stat = os.stat( path )
+
+    return ( stat.st_mtime_ns, stat.st_size )
+
+
+def _encode_signature( signature ):
+    return '{}:{}:{}'.format( SNAPSHOT_VERSION, *signature ).encode()
+
+
+def _write_table( df_aux, path, csv_path ):
+    """ Grava um dataframe em Feather sem compressão (permite memory-map), com a versão do CSV de origem
+        nos metadados, num arquivo temporário renomeado no final (nunca fica um arquivo pela metade)
+    """
+    table = pa.Table.from_pandas( df_aux, preserve_index=False )
+    metadata = dict( table.schema.metadata or {} )
+    metadata[SIGNATURE_KEY] = _encode_signature( source_signature( csv_path ) )
+    table = table.replace_schema_metadata( metadata )
+
+    tmp_path = path + '.tmp'
+    feather.write_feather( table, tmp_path, compression='uncompressed' )
+    os.replace( tmp_path, path )
+
+    return path
+
+
+def _read_table( path, csv_path ):
+    """ Abre um arquivo Feather com memory-map; None se ele não existir ou não for da versão atual do CSV
+        (sem o CSV, ex.: deploy só com os arquivos Feather, ele é usado como está)
+    """
+    if not os.path.exists( path ):
+        return None
+
+    table = feather.read_table( path, memory_map=True )
+    if os.path.exists( csv_path ):
+        metadata = table.schema.metadata or {}
+        if metadata.get( SIGNATURE_KEY ) != _encode_signature( source_signature( csv_path ) ):
+            return None
+
+    return table
+
+
+def write_snapshot( df1, csv_path ):
+    """ Esta função tem a responsabilidade de gravar o dataframe limpo em formato colunar
+        Tipos de ações:
+        1. Converter o dataframe para uma tabela Arrow
+        2. Registrar nos metadados a versão do CSV que gerou os dados
+        3. Gravar o arquivo Feather sem compressão (permite memory-map)
+
+        Input: Dataframe limpo e caminho do CSV de origem
+        Output: Caminho do snapshot gravado
+    """
+    return _write_table( df1, snapshot_path( csv_path ), csv_path )
+
+
+def snapshot_table( csv_path ):
+    """ Esta função tem a responsabilidade de abrir o snapshot como tabela Arrow, se ele estiver atualizado
+        Tipos de ações:
+        1. Verificar se o snapshot existe
+        2. Abrir o arquivo com memory-map (nada é copiado para a memória)
+        3. Comparar a versão gravada com a versão atual do CSV
+
+        Input: Caminho do arquivo CSV
+        Output: Tabela Arrow ou None quando o snapshot não existe ou está desatualizado
+    """
+    return _read_table( snapshot_path( csv_path ), csv_path )
+
+
+def _aggregate_columns( nome, aggregates ):
+    """ Colunas de um agregado gravado, na ordem do build_cube / partials_from_rows """
+    if nome == 'cube':
+        return CUBE_DIMENSIONS + CUBE_MEASURES
+
+    spec = aggregates[nome]
+
+    return spec['by'] + [partial_name( col, parcial ) for col, parciais in spec['cols'].items() for parcial in parciais]
+
+
+def write_aggregates( agregados, csv_path ):
+    """ Esta função tem a responsabilidade de gravar o cubo e os agregados materializados ao lado do snapshot
+        Tipos de ações:
+        1. Gravar cada tabela em train.<nome>.feather, com a versão do CSV de origem nos metadados
+
+        Input: Dicionário nome -> dataframe ('cube' + nomes de STREAM_AGGREGATES) e caminho do CSV
+        Output: Lista dos caminhos gravados
+    """
+    return [_write_table( df_aux, aggregate_path( csv_path, nome ), csv_path ) for nome, df_aux in agregados.items()]
+
+
+def read_aggregates( csv_path, aggregates=STREAM_AGGREGATES ):
+    """ Esta função tem a responsabilidade de ler o cubo e os agregados gravados, se estiverem atualizados
+        Tipos de ações:
+        1. Abrir train.<nome>.feather do cubo e de cada agregado de 'aggregates'
+        2. Conferir a versão do CSV e as colunas de cada um (um agregado redefinido é recalculado)
+        3. Converter para dataframes
+
+        Input: Caminho do arquivo CSV e agregados esperados
+        Output: Dicionário nome -> dataframe ('cube' + nomes de 'aggregates') ou None se faltar algum
+    """
+    agregados = {}
+    for nome in ['cube'] + list( aggregates ):
+        table = _read_table( aggregate_path( csv_path, nome ), csv_path )
+        if table is None or table.column_names != _aggregate_columns( nome, aggregates ):
+            return None
+        agregados[nome] = table.to_pandas( split_blocks=True )
+
+    return agregados
+
+
+# Snapshots abertos pelos backends de consulta (tabela Arrow em memory-map, categorias e versões)
+_OPEN_SNAPSHOTS = {}
+_OPEN_SNAPSHOTS_LOCK = threading.Lock()
+
+
+def _file_signatures( csv_path ):
+    """ Versões do CSV e do snapshot (None para o arquivo que não existir) """
+    return tuple( source_signature( arquivo ) if os.path.exists( arquivo ) else None
+                  for arquivo in ( csv_path, snapshot_path( csv_path ) ) )
+
+
+def refresh_snapshot( csv_path ):
+    """ Esta função tem a responsabilidade de manter aberto o snapshot atual para os backends de consulta
+        Tipos de ações:
+        1. Reabrir o snapshot quando o CSV ou o snapshot mudarem
+        2. Reconstruir o snapshot a partir do CSV quando ele estiver desatualizado
+        3. Guardar as categorias de cada coluna categórica, na ordem do snapshot (a mesma do pandas)
+        4. Publicar o snapshot novo com uma troca atômica da referência
+
+        Input: Caminho do arquivo CSV
+        Output: Dicionário com 'signature' (versões do CSV e do snapshot), 'table' (tabela Arrow),
+                'path' (caminho do snapshot) e 'categories' (coluna -> lista de categorias)
+    """
+    with _OPEN_SNAPSHOTS_LOCK:
+        aberto = _OPEN_SNAPSHOTS.get( csv_path )
+        if aberto is None or aberto['signature'] != _file_signatures( csv_path ):
+            table = snapshot_table( csv_path )
+            if table is None:
+                build_snapshot( csv_path )
+                table = snapshot_table( csv_path )
+            categorias = {campo.name: table.column( campo.name ).chunk( 0 ).dictionary.to_pylist()
+                          for campo in table.schema
+                          if pa.types.is_dictionary( campo.type ) and table.column( campo.name ).num_chunks > 0}
+            aberto = _OPEN_SNAPSHOTS[csv_path] = {'signature': _file_signatures( csv_path ), 'table': table,
+                                                  'path': snapshot_path( csv_path ), 'categories': categorias}
+
+        return aberto
+
+
+def current_snapshot( csv_path ):
+    """ Snapshot aberto para as consultas. Só a primeira abertura (ou REFRESH_INTERVAL = 0) acontece
+        na consulta; depois, o CSV é verificado e o snapshot reconstruído pela thread de atualização.
+    """
+    aberto = _OPEN_SNAPSHOTS.get( csv_path )
+    if aberto is None or REFRESH_INTERVAL <= 0:
+        return refresh_snapshot( csv_path )
+
+    start_refresh_worker( 'snapshot:{}'.format( csv_path ), refresh_snapshot, csv_path )
+
+    return aberto
+
+
+def read_snapshot( csv_path ):
+    """ Esta função tem a responsabilidade de ler o snapshot, se ele estiver atualizado
+        Tipos de ações:
+        1. Abrir o snapshot com o snapshot_table
+        2. Converter para dataframe
+
+        Input: Caminho do arquivo CSV
+        Output: Dataframe limpo ou None quando o snapshot não existe ou está desatualizado
+    """
+    table = snapshot_table( csv_path )
+
+    return None if table is None else table.to_pandas( split_blocks=True )
+
+
+def build_snapshot( csv_path ):
+    """ Esta função tem a responsabilidade de executar a etapa de ingestão
+        Tipos de ações:
+        1. Ler o CSV bruto
+        2. Aplicar o clean_code (em vários processos, com LAPLACE_WORKERS > 1)
+        3. Gravar o snapshot colunar
+
+        Input: Caminho do arquivo CSV
+        Output: Dataframe limpo
+    """
+    with stage( 'load.read_csv' ):
+        df_raw = pd.read_csv( csv_path )
+    df1 = parallel_clean( df_raw ) if WORKERS > 1 else clean_code( df_raw )
+    with stage( 'load.write_snapshot' ):
+        write_snapshot( df1, csv_path )
+
+    return df1
+
+
+if __name__ == '__main__':
+    # Uso: python -m utils.snapshot [train.csv]
+    csv_path = sys.argv[1] if len( sys.argv ) > 1 else 'train.csv'
+    df1 = build_snapshot( csv_path )
+    print( '{} linhas gravadas em {}'.format( len( df1 ), snapshot_path( csv_path ) ) )
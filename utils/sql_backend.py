@@ -0,0 +1,208 @@
+# Libraries
+import threading
+
+import pandas as pd
+
+from utils.cube import CUBE_DIMENSIONS
+from utils.streaming import STREAM_AGGREGATES, filters_for
+from utils.timing import timed
+
+# Nome da tabela de entregas nas consultas
+TABLE_NAME = 'entregas'
+
+# Estatísticas do plano em SQL (variância amostral, como o .std() do pandas)
+_STAT_SQL = {'count': 'COUNT({c})', 'sum': 'SUM({c})', 'mean': 'AVG({c})', 'std': 'STDDEV_SAMP({c})',
+             'min': 'MIN({c})', 'max': 'MAX({c})', 'nunique': 'COUNT(DISTINCT {c})', 'median': 'MEDIAN({c})'}
+
+# Agregados parciais em SQL, com os mesmos tipos do partials_from_rows (somas de float em float64)
+_PARTIAL_SQL = {'count': 'COUNT({c})', 'sum': 'SUM({c})', 'sumsq': 'SUM(CAST({c} AS DOUBLE) * CAST({c} AS DOUBLE))',
+                'min': 'MIN({c})', 'max': 'MAX({c})'}
+
+
+# Uma conexão DuckDB por snapshot aberto (caminho -> tabela Arrow da versão, conexão), compartilhada por
+# todas as threads: cada consulta usa o seu próprio cursor
+_CONNECTIONS = {}
+_CONNECTIONS_LOCK = threading.Lock()
+
+
+def _duckdb():
+    try:
+        import duckdb
+    except ImportError:
+        raise ImportError( 'O backend SQL precisa do duckdb (pip install duckdb), ou use LAPLACE_BACKEND=pandas' )
+
+    return duckdb
+
+
+def _connection( snapshot ):
+    """ Conexão DuckDB da versão do snapshot: criada na primeira consulta de uma versão nova, que
+        substitui a da versão anterior (os cursores ainda abertos nela continuam válidos)
+    """
+    with _CONNECTIONS_LOCK:
+        atual = _CONNECTIONS.get( snapshot['path'] )
+        if atual is None or atual[0] is not snapshot['table']:
+            atual = _CONNECTIONS[snapshot['path']] = ( snapshot['table'], _duckdb().connect() )
+
+        return atual[1]
+
+
+def _cursor( snapshot ):
+    """ Cursor de uma consulta, com a tabela Arrow do snapshot registrada (sem cópia) como 'entregas'.
+        Cada consulta tem o seu: cursores da mesma conexão podem ser usados ao mesmo tempo por várias
+        threads, e o registro de tabelas não é compartilhado entre eles.
+    """
+    con = _connection( snapshot ).cursor()
+    con.register( TABLE_NAME, snapshot['table'] )
+
+    return con
+
+
+def _types( con ):
+    """ Tipo DuckDB de cada coluna da tabela de entregas (categorias do pandas chegam como VARCHAR) """
+    tabela = con.view( TABLE_NAME )
+
+    return {col: str( tipo ) for col, tipo in zip( tabela.columns, tabela.types )}
+
+
+def _quote( col ):
+    return '"{}"'.format( col.replace( '"', '""' ) )
+
+
+def _where( date_slider, traffic_options, by ):
+    """ Filtros da barra lateral como predicados da consulta, mais a exclusão de chaves nulas
+        (o groupby do pandas descarta os grupos com chave ausente). Sem data limite (None), só a
+        exclusão de chaves nulas: a consulta cobre todo o histórico.
+    """
+    predicados = ['TRUE']
+    parametros = []
+    if date_slider is not None:
+        predicados = ['"Order_Date" < ?']
+        parametros = [pd.Timestamp( date_slider ).to_pydatetime()]
+        opcoes = list( traffic_options )
+        if not opcoes:
+            predicados.append( 'FALSE' )
+        else:
+            predicados.append( 'CAST("Road_traffic_density" AS VARCHAR) IN ({})'.format( ', '.join( ['?'] * len( opcoes ) ) ) )
+            parametros.extend( opcoes )
+    predicados.extend( '{} IS NOT NULL'.format( _quote( col ) ) for col in by )
+
+    return ' AND '.join( predicados ), parametros
+
+
+def _query( snapshot, by, expressoes, date_slider, traffic_options ):
+    """ SELECT das chaves e expressões, com os filtros empurrados para o WHERE, agrupado e ordenado pelas chaves """
+    categorias = snapshot['categories']
+
+    chaves = [_quote( col ) if col == 'Order_Date' else 'CAST({} AS VARCHAR) AS {}'.format( _quote( col ), _quote( col ) )
+              for col in by]
+    where, parametros = _where( date_slider, traffic_options, by )
+    sql = 'SELECT {} FROM {} WHERE {}'.format( ', '.join( chaves + expressoes ), TABLE_NAME, where )
+    if by:
+        posicoes = ', '.join( str( i + 1 ) for i in range( len( by ) ) )
+        sql += ' GROUP BY {} ORDER BY {}'.format( posicoes, posicoes )
+
+    with _cursor( snapshot ) as con:
+        df_aux = con.execute( sql, parametros ).df()
+
+    # chaves categóricas voltam com as categorias do snapshot, como no caminho pandas
+    for col in by:
+        if col in categorias:
+            df_aux[col] = pd.Categorical( df_aux[col], categories=categorias[col] )
+
+    return df_aux
+
+
+def stats_query( consultas, date_slider, traffic_options, snapshot ):
+    """ Esta função tem a responsabilidade de calcular as estatísticas de um plano em SQL
+        Tipos de ações:
+        1. Uma consulta por conjunto de chaves, com todas as estatísticas dele
+        2. Empurrar os filtros de data e de trânsito para o WHERE
+
+        Input: Lista de ( chaves, [( apelido, estatística, coluna )] ) (backend.plan_queries), data limite,
+               opções de trânsito e snapshot aberto
+        Output: Lista de dataframes (chaves + uma coluna por apelido), na ordem das consultas
+    """
+    tabelas = []
+    for by, estatisticas in consultas:
+        expressoes = ['{} AS {}'.format( _STAT_SQL[stat].format( c=_quote( col ) ), apelido )
+                      for apelido, stat, col in estatisticas]
+        tabelas.append( _query( snapshot, by, expressoes, date_slider, traffic_options ) )
+
+    return tabelas
+
+
+@timed( 'aggregate' )
+def partials_query( by, necessidades, date_slider, traffic_options, snapshot ):
+    """ Esta função tem a responsabilidade de calcular agregados parciais em SQL
+        Tipos de ações:
+        1. Montar contagem, soma, soma dos quadrados, mínimo e máximo pedidos, já filtrados
+        2. Devolver no formato do partials_from_rows ('coluna__parcial')
+
+        Input: Chaves, parciais por coluna, data limite, opções de trânsito e snapshot aberto
+        Output: Dataframe de parciais
+    """
+    with _cursor( snapshot ) as con:
+        tipos = _types( con )
+    expressoes = []
+    for col, parciais in necessidades.items():
+        for parcial in parciais:
+            expressao = _PARTIAL_SQL[parcial].format( c=_quote( col ) )
+            # soma de inteiros volta como inteiro (o DuckDB soma em HUGEINT)
+            if parcial == 'sum' and tipos[col] in ( 'TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT' ):
+                expressao = 'CAST({} AS BIGINT)'.format( expressao )
+            expressoes.append( '{} AS {}'.format( expressao, _quote( '{}__{}'.format( col, parcial ) ) ) )
+
+    return _query( snapshot, by, expressoes, date_slider, traffic_options )
+
+
+def aggregates_query( date_slider, traffic_options, snapshot, aggregates=STREAM_AGGREGATES ):
+    """ Agregados materializados (perfil diário dos entregadores, ...) calculados em SQL, já filtrados
+        (os agregados sem 'Order_Date' na chave cobrem todo o histórico, como no caminho pandas)
+    """
+    return {nome: partials_query( spec['by'], spec['cols'], *filters_for( spec, date_slider, traffic_options ), snapshot )
+            for nome, spec in aggregates.items()}
+
+
+@timed( 'aggregate' )
+def cube_query( date_slider, traffic_options, snapshot ):
+    """ Esta função tem a responsabilidade de montar o cubo de KPIs em SQL
+        Tipos de ações:
+        1. Agrupar as entregas filtradas pelas dimensões do cubo
+        2. Calcular contagem, soma e soma dos quadrados do tempo de entrega
+
+        Input: Data limite, opções de trânsito e snapshot aberto
+        Output: Cubo filtrado, com as mesmas colunas do build_cube
+    """
+    tempo = 'CAST("Time_taken(min)" AS DOUBLE)'
+    expressoes = ['COUNT(*) AS "count"', 'SUM({t}) AS time_sum'.format( t=tempo ),
+                  'SUM({t} * {t}) AS time_sumsq'.format( t=tempo )]
+
+    return _query( snapshot, CUBE_DIMENSIONS, expressoes, date_slider, traffic_options )
+
+
+@timed( 'aggregate' )
+def weekly_orders_query( date_slider, traffic_options, snapshot ):
+    """ Pedidos e entregadores únicos por semana do ano, no formato do weekly_orders """
+    where, parametros = _where( date_slider, traffic_options, [] )
+    sql = ( 'SELECT strftime("Order_Date", \'%U\') AS week_of_year, COUNT("ID") AS "ID", '
+            'COUNT(DISTINCT "Delivery_person_ID") AS "Delivery_person_ID" '
+            'FROM {} WHERE {} GROUP BY 1 ORDER BY 1'.format( TABLE_NAME, where ) )
+
+    with _cursor( snapshot ) as con:
+        return con.execute( sql, parametros ).df()
+
+
+def rows_query( colunas, date_slider, traffic_options, snapshot ):
+    """ Linhas filtradas, só com as colunas pedidas (ex.: coordenadas do mapa) """
+    where, parametros = _where( date_slider, traffic_options, [] )
+    sql = 'SELECT {} FROM {} WHERE {}'.format( ', '.join( _quote( col ) for col in colunas ), TABLE_NAME, where )
+    with _cursor( snapshot ) as con:
+        df_aux = con.execute( sql, parametros ).df()
+
+    # colunas categóricas voltam com as categorias do snapshot, como no caminho pandas
+    categorias = snapshot['categories']
+    for col in colunas:
+        if col in categorias:
+            df_aux[col] = pd.Categorical( df_aux[col], categories=categorias[col] )
+
+    return df_aux
@@ -0,0 +1,213 @@
+# Libraries
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from utils.cleaning import clean_code
+from utils.cube import CUBE_DIMENSIONS, CUBE_MEASURES, build_cube
+from utils.incremental import align_categories
+from utils.plan import PARTIAL_ROLLUP, partials_from_rows
+
+# Linhas do CSV lidas por vez: o pico de memória da ingestão depende deste valor, não do arquivo
+CHUNK_SIZE = 500_000
+
+# Agregados parciais (contagem, soma, soma dos quadrados, mínimo, máximo) reduzidos a cada pedaço.
+# As chaves com 'Order_Date' e 'Road_traffic_density' continuam valendo para os filtros das páginas
+# (o apply_filters funciona em qualquer tabela ordenada por data).
+# 'deliverers' é o perfil diário de cada entregador, mantido também em memória pelo utils.data; a cidade
+# fica na chave porque as tabelas de mais rápidos e mais lentos por cidade saem dele, com os filtros.
+# 'deliverer_mix' conta as entregas de cada entregador por cidade e veículo em todo o histórico (sem
+# data: não recebe os filtros), para a cidade e o veículo principais; cresce com os entregadores, não
+# com as entregas.
+STREAM_AGGREGATES = {
+    'deliverers': {'by': ['Order_Date', 'Road_traffic_density', 'City', 'Delivery_person_ID'],
+                   'cols': {'Time_taken(min)': ['count', 'sum', 'sumsq'],
+                            'Delivery_person_Ratings': ['count', 'sum', 'sumsq'],
+                            'Delivery_person_Age': ['min', 'max'],
+                            'Vehicle_condition': ['min', 'max'],
+                            'distance': ['sum']}},
+    'deliverer_mix': {'by': ['Delivery_person_ID', 'City', 'Type_of_vehicle'],
+                      'cols': {'Time_taken(min)': ['count']}},
+    'ratings': {'by': ['Order_Date', 'Road_traffic_density', 'Weatherconditions'],
+                'cols': {'Delivery_person_Ratings': ['count', 'sum', 'sumsq']}},
+}
+
+
+def filters_for( spec, date_slider, traffic_options ):
+    """ Filtros da barra lateral de um agregado: ( None, None ) quando a chave não tem 'Order_Date' """
+    if 'Order_Date' not in spec['by']:
+        return None, None
+
+    return date_slider, traffic_options
+
+
+def merge_partials( partes, by, agg=None ):
+    """ Esta função tem a responsabilidade de consolidar agregados parciais de vários pedaços
+        Tipos de ações:
+        1. Unificar as categorias das chaves de todas as partes
+        2. Concatenar e reagrupar, consolidando cada parcial (soma, mínimo ou máximo)
+
+        Input: Lista de dataframes de parciais, chaves e, opcionalmente, a consolidação de cada
+               coluna (o padrão sai do nome 'coluna__parcial')
+        Output: Dataframe de parciais consolidado, ordenado pelas chaves
+    """
+    if len( partes ) == 1:
+        return partes[0]
+
+    base = partes[0].copy( deep=False )
+    for parte in partes[1:]:
+        base, _ = align_categories( base, parte.copy( deep=False ) )
+    partes = [base] + [align_categories( base, parte.copy( deep=False ) )[1] for parte in partes[1:]]
+    if agg is None:
+        agg = {c: PARTIAL_ROLLUP[c.rsplit( '__', 1 )[1]] for c in base.columns if c not in by}
+
+    return ( pd.concat( partes, ignore_index=True )
+               .groupby( by, observed=True )
+               .agg( agg )
+               .sort_index()
+               .reset_index() )
+
+
+def build_aggregates( df1, aggregates=STREAM_AGGREGATES ):
+    """ Esta função tem a responsabilidade de materializar os agregados parciais das entregas
+        Tipos de ações:
+        1. Fazer uma passada agrupada por agregado, calculando os parciais de STREAM_AGGREGATES
+
+        Input: Dataframe limpo e agregados a calcular
+        Output: Dicionário nome -> dataframe de parciais, ordenado pelas chaves
+    """
+    return {nome: partials_from_rows( df1, spec['by'], spec['cols'] ) for nome, spec in aggregates.items()}
+
+
+def _key_codes( agregado, novo, by ):
+    """ Código inteiro da chave completa de cada linha das duas tabelas (mesmas categorias), na ordem do
+        groupby: códigos das categorias e das datas ordenadas, combinados em base mista. None se o número
+        de chaves possíveis não couber num int64.
+    """
+    codigos = [np.zeros( len( agregado ), dtype='int64' ), np.zeros( len( novo ), dtype='int64' )]
+    total = 1
+    for col in by:
+        if isinstance( agregado[col].dtype, pd.CategoricalDtype ):
+            partes = [agregado[col].cat.codes.to_numpy(), novo[col].cat.codes.to_numpy()]
+            n = len( agregado[col].cat.categories )
+        else:
+            valores, unicos = pd.factorize( np.concatenate( [agregado[col].to_numpy(), novo[col].to_numpy()] ), sort=True )
+            partes = [valores[:len( agregado )], valores[len( agregado ):]]
+            n = len( unicos )
+        total *= max( n, 1 )
+        if total >= 2 ** 62:
+            return None
+        codigos = [codigo * n + parte for codigo, parte in zip( codigos, partes )]
+
+    return codigos
+
+
+def merge_batch( agregado, novo, by, agg=None ):
+    """ Esta função tem a responsabilidade de somar os parciais de um lote a um agregado existente
+        Tipos de ações:
+        1. Separar as linhas do agregado cuja chave aparece no lote
+        2. Consolidar só essas linhas com o lote (merge_partials); as demais não mudam
+        3. Intercalar as linhas consolidadas nas demais pelo código da chave: as duas partes já estão
+           ordenadas, então a ordenação estável (timsort) só junta duas sequências ordenadas
+
+        O custo de consolidar depende do número de linhas do lote, não do histórico; só a cópia das
+        linhas para o dataframe novo é proporcional ao tamanho do agregado.
+
+        Input: Agregado existente, parciais do lote, chaves e consolidação de cada coluna (opcional)
+        Output: Agregado atualizado, ordenado pelas chaves
+    """
+    if len( novo ) == 0:
+        return agregado
+
+    agregado, novo = align_categories( agregado.copy( deep=False ), novo.copy( deep=False ) )
+    codigos = _key_codes( agregado, novo, by )
+    if codigos is None:
+        return merge_partials( [agregado, novo], by, agg )
+
+    atuais, novos = codigos
+    tocadas = pd.Series( atuais ).isin( novos ).to_numpy()
+    consolidado = merge_partials( [agregado.loc[tocadas], novo], by, agg )
+    # uma linha por chave, na ordem das chaves: os códigos do consolidado são os códigos únicos das duas partes
+    chave = np.concatenate( [atuais[~tocadas], np.unique( np.concatenate( [atuais[tocadas], novos] ) )] )
+    df_aux = pd.concat( [agregado.loc[~tocadas], consolidado], ignore_index=True )
+
+    return df_aux.take( np.argsort( chave, kind='stable' ) ).reset_index( drop=True )
+
+
+def merge_aggregates( agregados, novos, aggregates=STREAM_AGGREGATES ):
+    """ Esta função tem a responsabilidade de somar os agregados de um lote aos existentes
+        Tipos de ações:
+        1. Consolidar, agregado por agregado, só as linhas cujas chaves o lote toca (merge_batch)
+
+        Input: Dicionário de agregados existentes, dicionário de agregados do lote e especificação
+        Output: Dicionário de agregados atualizado
+    """
+    return {nome: merge_batch( agregados[nome], novos[nome], spec['by'] ) for nome, spec in aggregates.items()}
+
+
+def stream_ingest( csv_path, chunksize=CHUNK_SIZE, aggregates=STREAM_AGGREGATES ):
+    """ Esta função tem a responsabilidade de ingerir um CSV maior que a memória
+        Tipos de ações:
+        1. Ler o CSV em pedaços de 'chunksize' linhas
+        2. Aplicar o clean_code em cada pedaço
+        3. Reduzir o pedaço ao cubo de KPIs (contagens diárias e tempo por cidade, trânsito, ...)
+           e aos agregados de STREAM_AGGREGATES (entregadores e avaliações)
+        4. Descartar o pedaço: só os agregados ficam em memória
+
+        O cubo, 'ratings' e 'deliverer_mix' ficam limitados (dias x categorias, entregadores x categorias);
+        'deliverers' tem uma linha por entregador, dia, trânsito e cidade e cresce com o histórico (com um
+        entregador novo a cada ~30 entregas, chega perto de uma linha por entrega). O pico de memória é o
+        de um pedaço mais o desses agregados, não o do CSV inteiro.
+
+        Os parciais de cada pedaço ficam numa fila e só são consolidados quando a fila passa do
+        tamanho do acumulado, para o custo de consolidar não crescer com o número de pedaços.
+
+        Input: Caminho do CSV, linhas por pedaço e agregados a calcular
+        Output: Dicionário nome -> dataframe ('cube' + nomes de 'aggregates') e 'rows' -> número de
+                entregas ingeridas (linhas depois do clean_code)
+    """
+    chaves = {'cube': CUBE_DIMENSIONS, **{nome: spec['by'] for nome, spec in aggregates.items()}}
+    # as medidas do cubo são todas somas
+    consolidacao = {'cube': {medida: 'sum' for medida in CUBE_MEASURES}}
+    acumulado = {nome: [] for nome in chaves}
+    linhas = 0
+    for chunk in pd.read_csv( csv_path, chunksize=chunksize ):
+        df1 = clean_code( chunk )
+        linhas += len( df1 )
+
+        partes = {'cube': build_cube( df1 ), **build_aggregates( df1, aggregates )}
+        for nome, parte in partes.items():
+            fila = acumulado[nome]
+            fila.append( parte )
+            # fila[0] é o acumulado consolidado; o resto são pedaços ainda não somados
+            if sum( len( p ) for p in fila[1:] ) >= len( fila[0] ):
+                acumulado[nome] = [merge_partials( fila, chaves[nome], consolidacao.get( nome ) )]
+
+    resultado = {nome: merge_partials( fila, chaves[nome], consolidacao.get( nome ) )
+                 for nome, fila in acumulado.items()}
+    resultado['rows'] = linhas
+
+    return resultado
+
+
+def aggregate_path( csv_path, nome ):
+    """ Caminho do arquivo de um agregado: train.csv -> train.<nome>.feather (lido pelo utils.data) """
+    return '{}.{}.feather'.format( os.path.splitext( csv_path )[0], nome )
+
+
+if __name__ == '__main__':
+    # Uso: python -m utils.streaming [train.csv] [linhas por pedaço]
+    # Grava o cubo e os agregados com a versão do CSV: a próxima carga do app lê esses arquivos em vez
+    # de recalculá-los a partir das entregas
+    from utils.snapshot import write_aggregates
+
+    csv_path = sys.argv[1] if len( sys.argv ) > 1 else 'train.csv'
+    chunksize = int( sys.argv[2] ) if len( sys.argv ) > 2 else CHUNK_SIZE
+
+    resultado = stream_ingest( csv_path, chunksize )
+    linhas = resultado.pop( 'rows' )
+    for nome, path in zip( resultado, write_aggregates( resultado, csv_path ) ):
+        print( '{}: {} linhas gravadas em {}'.format( nome, len( resultado[nome] ), path ) )
+    print( '{} entregas ingeridas'.format( linhas ) )
@@ -0,0 +1,137 @@
+# Libraries
+import contextlib
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+
+# Liga a instrumentação (ex.: LAPLACE_PERF=1 streamlit run Home.py). Desligada, stage() devolve
+# um contexto vazio compartilhado e timed() devolve a própria função, sem custo por chamada.
+PERF_ENABLED = os.environ.get( 'LAPLACE_PERF', '' ) == '1'
+
+# Arquivo JSON-lines onde cada rerun instrumentado grava uma linha
+PERF_LOG_PATH = os.environ.get( 'LAPLACE_PERF_LOG', 'perf.jsonl' )
+
+_NOOP = contextlib.nullcontext()
+_LOG_LOCK = threading.Lock()
+
+# Cada sessão roda o script da página na sua própria thread, então as medidas do rerun
+# ficam por thread
+_RERUN = threading.local()
+
+
+@contextlib.contextmanager
+def _timer( nome ):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        etapas = getattr( _RERUN, 'stages', None )
+        if etapas is not None:
+            etapas[nome] = etapas.get( nome, 0.0 ) + time.perf_counter() - inicio
+
+
+def stage( nome ):
+    """ Esta função tem a responsabilidade de cronometrar um trecho do rerun
+        Tipos de ações:
+        1. Desligada, devolver um contexto vazio (nenhuma medida)
+        2. Ligada, somar o tempo do bloco 'with' na etapa 'nome' do rerun atual
+
+        Input: Nome da etapa (ex.: 'load', 'filter', 'figure.order_metric', 'render.order_metric')
+        Output: Gerenciador de contexto
+    """
+    return _timer( nome ) if PERF_ENABLED else _NOOP
+
+
+def timed( prefixo ):
+    """ Decorador que cronometra a função como a etapa '<prefixo>.<nome da função>'.
+        Desligado, devolve a função original.
+    """
+    def decorador( func ):
+        if not PERF_ENABLED:
+            return func
+
+        nome = '{}.{}'.format( prefixo, func.__name__ )
+
+        @functools.wraps( func )
+        def wrapper( *args, **kwargs ):
+            with _timer( nome ):
+                return func( *args, **kwargs )
+
+        return wrapper
+
+    return decorador
+
+
+def start_rerun( pagina ):
+    """ Esta função tem a responsabilidade de abrir as medidas de um rerun
+        Tipos de ações:
+        1. Guardar a página e o início do rerun
+        2. Zerar as etapas medidas na thread da sessão
+
+        Input: Nome da página
+        Output: None
+    """
+    if PERF_ENABLED:
+        _RERUN.page = pagina
+        _RERUN.start = time.perf_counter()
+        _RERUN.stages = {}
+
+    return None
+
+
+def finish_rerun():
+    """ Esta função tem a responsabilidade de fechar as medidas de um rerun
+        Tipos de ações:
+        1. Calcular o tempo total do rerun
+        2. Acrescentar uma linha ao log JSON-lines (página, data, total e etapas em ms)
+        3. Mostrar o painel de performance na barra lateral
+
+        Input: None
+        Output: Dicionário da linha gravada (None com a instrumentação desligada)
+    """
+    if not PERF_ENABLED or getattr( _RERUN, 'stages', None ) is None:
+        return None
+
+    registro = {'page': _RERUN.page,
+                'date': datetime.datetime.now().isoformat( timespec='milliseconds' ),
+                'total_ms': round( 1000 * ( time.perf_counter() - _RERUN.start ), 3 ),
+                'stages': {nome: round( 1000 * segundos, 3 ) for nome, segundos in _RERUN.stages.items()}}
+    _RERUN.stages = None
+
+    with _LOG_LOCK:
+        with open( PERF_LOG_PATH, 'a' ) as arquivo:
+            arquivo.write( json.dumps( registro ) + '\n' )
+
+    _perf_panel( registro )
+
+    return registro
+
+
+def _perf_panel( registro ):
+    """ Painel 'Performance' na barra lateral com o tempo de cada etapa do último rerun, o cache de
+        figuras e a situação das threads de atualização dos dados
+    """
+    import pandas as pd
+    import streamlit as st
+
+    with st.sidebar.expander( 'Performance' ):
+        st.markdown( 'Rerun: **{:.0f} ms**'.format( registro['total_ms'] ) )
+        etapas = pd.Series( registro['stages'], name='ms', dtype='float64' )
+        st.dataframe( etapas.sort_values( ascending=False ).round( 1 ) )
+
+        from utils.figure_cache import figure_cache_stats
+        cache = figure_cache_stats()
+        st.markdown( 'Cache de figuras: **{hits}** acertos, **{misses}** faltas, {size}/{max_size} figuras'
+                     .format( **cache ) )
+
+        from utils.refresh import refresh_workers_status
+        workers = refresh_workers_status()
+        if workers:
+            agora = time.time()
+            st.dataframe( pd.DataFrame( [{'worker': nome, 'alive': viva,
+                                          'last_check_s': None if ultima is None else round( agora - ultima, 1 ),
+                                          'error': erro}
+                                         for nome, ( viva, ultima, erro ) in workers.items()] ).set_index( 'worker' ) )